@@ -0,0 +1,229 @@
+# analytics.py
+
+# Predicts how a deck will play without simulating whole games, using NumPy arrays
+#
+#     python analytics.py uno_cards_special_with_draw.csv
+
+import argparse
+
+import numpy as np
+
+from batch import random_policy
+from card import CARD_TABLE, PLAYABLE, card_id
+from deck import load_card_ids
+from game import UnoGame
+
+NUMBER = "number"  # the kind of every card without a special type
+
+# Analyses are cached per deck file, like decks are in deck.py
+ANALYTICS_CACHE = {}
+
+
+class DeckAnalytics():
+    """Statistics about one deck file. The deck is loaded into arrays once, and
+    every statistic is computed from those arrays without playing any games.
+
+    Cards are indexed by their position in `ids`, the distinct card ids in the
+    deck. Top cards are indexed by their position in `top_ids`, which is the same
+    except that wild cards are replaced by their four colored versions (a wild card
+    is always colored once it is on top).
+
+    Args:
+        deck_file (str): The filepath to the deck of cards
+    """
+
+    def __init__(self, deck_file):
+        self.deck_file = deck_file
+        self.ids, self.counts = np.unique(np.array(load_card_ids(deck_file), dtype=np.intp), return_counts=True)
+        self.total = int(self.counts.sum())
+
+        # Wild cards on top come in each color, equally often
+        top_ids, top_weights, top_cards = [], [], []
+        for i, card_id_ in enumerate(self.ids.tolist()):
+            card = CARD_TABLE[card_id_]
+            if card.special in ("wild", "wild-draw-four"):
+                colored = [card_id(color, None, card.special) for color in UnoGame.COLORS]
+            else:
+                colored = [card_id_]
+            for colored_id in colored:
+                top_ids.append(colored_id)
+                top_weights.append(self.counts[i] / len(colored))
+                top_cards.append(i)
+        self.top_ids = np.array(top_ids, dtype=np.intp)
+        self.top_weights = np.array(top_weights) / self.total  # chance of each top card
+        self.top_cards = np.array(top_cards, dtype=np.intp)     # the deck card each top card is
+        self.playable = np.array([[PLAYABLE[top][i] for i in self.ids.tolist()] for top in top_ids], dtype=bool)
+
+        self.kinds = sorted({CARD_TABLE[i].special or NUMBER for i in self.ids.tolist()}, key=lambda kind: (kind != NUMBER, kind))
+        self.kind = np.array([self.kinds.index(CARD_TABLE[i].special or NUMBER) for i in self.ids.tolist()], dtype=np.intp)
+
+    def special_frequencies(self):
+        """ Returns the fraction of the deck that is each kind of card
+
+        Returns:
+            (dict) kind ("number" or a special type) -> fraction of the deck
+        """
+        totals = np.bincount(self.kind, weights=self.counts, minlength=len(self.kinds))
+        return {kind: float(total / self.total) for kind, total in zip(self.kinds, totals)}
+
+    def playable_counts(self):
+        """ Returns how many of the other cards in the deck can be played on each
+        top card (the top card itself is not counted)
+
+        Returns:
+            (array [top cards]) the counts
+        """
+        counts = self.playable @ self.counts
+        return counts - self.playable[np.arange(len(self.top_ids)), self.top_cards]
+
+    def playability_density(self):
+        """ Returns how likely a card of one kind is to be playable on a top card
+        of another kind, e.g. density[kinds.index("number"), kinds.index("skip")] is
+        the chance that a random skip card can be played on a random number card.
+
+        Returns:
+            (array [kinds, kinds]) the chances, indexed by top card kind, then card kind
+        """
+        top_kinds = np.zeros((len(self.kinds), len(self.top_ids)))
+        top_kinds[self.kind[self.top_cards], np.arange(len(self.top_ids))] = self.top_weights
+        card_kinds = np.zeros((len(self.ids), len(self.kinds)))
+        card_kinds[np.arange(len(self.ids)), self.kind] = self.counts
+        pairs = top_kinds @ self.playable @ card_kinds
+        return pairs / np.outer(top_kinds.sum(axis=1), card_kinds.sum(axis=0))
+
+    def expected_playable(self, hand_size=UnoGame.START_CARDS):
+        """ Returns the expected number of playable cards in a random hand on a
+        random top card, and the chance that the hand has at least one
+
+        Args:
+            hand_size (int): the number of cards in the hand
+
+        Returns:
+            (float, float) the expected number of playable cards and the chance of any
+        """
+        others = self.total - 1
+        playable = self.playable_counts()
+        expected = hand_size * playable / others
+        # The chance that none of the hand_size cards drawn from the others is playable
+        drawn = np.arange(hand_size)
+        none = np.prod(np.clip((others - playable[:, None] - drawn) / (others - drawn), 0, None), axis=1)
+        return float(self.top_weights @ expected), float(self.top_weights @ (1 - none))
+
+    def estimate_turns_to_win(self, num_hands=1000000, hand_size=UnoGame.START_CARDS, max_turns=200,
+                              seed=None, chunk_size=65536):
+        """ Estimates how many turns it takes to get rid of a hand by playing out
+        many random hands at once. Each turn the top card is a random card from the
+        deck; the player plays a random playable card or else draws one. Opponents
+        and special card actions are left out, so this is a measure of how hard the
+        deck is to play through rather than a prediction of real game length.
+
+        Args:
+            num_hands (int): how many hands to sample
+            hand_size (int): the number of cards in each starting hand
+            max_turns (int): turns after which a hand counts as never finishing
+            seed (int): seed for the random numbers
+            chunk_size (int): how many hands to play at once (this limits memory use)
+
+        Returns:
+            (array [max_turns + 1]) entry i counts the hands that finished on turn
+            i + 1; the last entry counts the hands that didn't finish
+        """
+        rng = np.random.default_rng(seed)
+        deck = np.repeat(np.arange(len(self.ids)), self.counts)
+        top_cumulative = np.cumsum(self.top_weights)
+        draw_cumulative = np.cumsum(self.counts) / self.total
+        finished = np.zeros(max_turns + 1, dtype=np.int64)
+        for start in range(0, num_hands, chunk_size):
+            size = min(chunk_size, num_hands - start)
+            dealt = np.argpartition(rng.random((size, len(deck))), hand_size, axis=1)[:, :hand_size]
+            hands = np.zeros((size, len(self.ids)), dtype=np.int16)
+            np.add.at(hands, (np.arange(size)[:, None], deck[dealt]), 1)
+            sizes = np.full(size, hand_size)
+
+            for turn in range(1, max_turns + 1):
+                rows = np.arange(len(hands))
+                top = np.minimum(np.searchsorted(top_cumulative, rng.random(len(hands))), len(self.top_ids) - 1)
+                cards, colors = random_policy(hands, self.playable[top] & (hands > 0), top, rng)
+                played = cards >= 0
+                drawn = np.minimum(np.searchsorted(draw_cumulative, rng.random(len(hands))), len(self.ids) - 1)
+                hands[rows, np.where(played, cards, drawn)] += np.where(played, -1, 1).astype(np.int16)
+                sizes += np.where(played, -1, 1)
+                done = sizes == 0
+                finished[turn - 1] += np.count_nonzero(done)
+                if done.any():
+                    hands = hands[~done]
+                    sizes = sizes[~done]
+                if len(hands) == 0:
+                    break
+            finished[max_turns] += len(hands)
+        return finished
+
+    def features(self, hand_size=UnoGame.START_CARDS):
+        """ Returns the deck's statistics as a flat dict of numbers, for strategy code
+        that wants to know what kind of deck it is playing with
+
+        Args:
+            hand_size (int): the hand size for expected_playable
+
+        Returns:
+            (dict) feature name -> value
+        """
+        expected, any_playable = self.expected_playable(hand_size)
+        features = {"cards": float(self.total), "expected playable": expected, "any playable": any_playable,
+                    "playable fraction": float(self.top_weights @ self.playable_counts()) / (self.total - 1)}
+        for kind, frequency in self.special_frequencies().items():
+            features["{} frequency".format(kind)] = frequency
+        return features
+
+    def playable_chance(self, top_card):
+        """ Returns the chance that a random other card from the deck can be played
+        on a top card
+
+        Args:
+            top_card (Card): the top card
+
+        Returns:
+            (float) the chance
+        """
+        counts = self.playable_counts()
+        top = np.flatnonzero(self.top_ids == top_card.id)
+        if len(top):
+            return float(counts[top[0]] / (self.total - 1))
+        row = np.frombuffer(bytes(PLAYABLE[top_card.id]), dtype=np.uint8)
+        return float(row[self.ids] @ self.counts / self.total)
+
+
+def deck_analytics(deck_file):
+    """ Returns the DeckAnalytics for a deck file, computing them the first time
+
+    Args:
+        deck_file (str): The filepath to the deck of cards
+    """
+    if deck_file not in ANALYTICS_CACHE:
+        ANALYTICS_CACHE[deck_file] = DeckAnalytics(deck_file)
+    return ANALYTICS_CACHE[deck_file]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Describe how a deck of Uno cards plays.")
+    parser.add_argument("deck", help="deck file")
+    parser.add_argument("-n", "--hands", type=int, default=1000000, help="hands to sample for the turns-to-win estimate")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed for the estimate")
+    args = parser.parse_args()
+
+    analytics = deck_analytics(args.deck)
+    for name, value in analytics.features().items():
+        print("{:<28} {:.3f}".format(name, value))
+
+    print("\nChance a card can be played on a top card (rows: top card kind, columns: card kind)")
+    print(" " * 16 + "".join("{:>16}".format(kind) for kind in analytics.kinds))
+    for kind, row in zip(analytics.kinds, analytics.playability_density()):
+        print("{:<16}".format(kind) + "".join("{:>16.3f}".format(value) for value in row))
+
+    finished = analytics.estimate_turns_to_win(args.hands, seed=args.seed)
+    turns = np.arange(1, len(finished))
+    done = finished[:-1]
+    print("\nTurns to play out a {} card hand, over {} hands:".format(UnoGame.START_CARDS, args.hands))
+    print("  mean {:.1f}, median {}, {:.2%} not finished after {} turns".format(
+        (turns * done).sum() / done.sum(), turns[np.searchsorted(done.cumsum(), done.sum() / 2)],
+        finished[-1] / finished.sum(), len(finished) - 1))
@@ -0,0 +1,259 @@
+# batch.py
+
+# Plays thousands of computer-only Uno games in lockstep using NumPy arrays
+
+from collections import Counter
+
+import numpy as np
+
+from card import CARD_TABLE, PLAYABLE, card_id
+from deck import load_card_ids
+from game import UnoGame
+
+NO_SPECIAL, WILD, SKIP, REVERSE, DRAW_TWO, WILD_DRAW_FOUR = range(6)
+SPECIAL_CODES = {None: NO_SPECIAL, "wild": WILD, "skip": SKIP, "reverse": REVERSE,
+                 "draw-two": DRAW_TWO, "wild-draw-four": WILD_DRAW_FOUR}
+
+
+def basic_policy(hands, valid, top, rng, last=None):
+    """ The array version of ComputerPlayer: plays the last card in hand without
+    checking whether it is valid, and always picks red.
+
+    Args:
+        hands (array [games, card ids]): how many of each card the players hold
+        valid (array [games, card ids]): which held cards can be played on the top card
+        top (array [games]): the top card ids
+        rng (numpy Generator): random numbers for the policy
+        last (array [games]): the card at the end of each player's hand, in the order
+            a Hand would hold it (-1 if the hand is empty)
+
+    Returns:
+        (array of card ids, array of color indexes) the choices. -1 means draw a card.
+    """
+    return last.copy(), np.zeros(len(last), dtype=np.intp)
+
+
+def random_policy(hands, valid, top, rng, last=None):
+    """ The array version of montecarlo.RolloutPlayer: plays a random valid card from
+    hand (or draws if there are none) and picks a random color.
+
+    Args and Returns are the same as basic_policy.
+    """
+    weights = np.where(valid, hands, 0)
+    total = weights.sum(axis=1)
+    pick = np.floor(rng.random(len(total)) * total)
+    cards = (weights.cumsum(axis=1) <= pick[:, None]).sum(axis=1)
+    cards[total == 0] = -1
+    return cards, rng.integers(0, len(UnoGame.COLORS), len(cards))
+
+
+# Policies are called as policy(hands, valid, top, rng, last=last)
+POLICIES = {
+    "basic": basic_policy,
+    "random": random_policy,
+}
+
+
+class BatchUnoGame():
+    """Plays many computer-only UnoGames at once. Every game is a row in a set of
+    NumPy arrays, and each call to step() plays one turn of every unfinished game
+    using the same rules as UnoGame.
+
+    Args:
+        num_games (int): the number of games to play
+        strategies (list of str or function): one policy per seat (see POLICIES)
+        deck_file (str): The filepath to the deck of cards
+        total_turns (int): the number of turns before a game ends without a winner
+        seed (int): seed for the games' random numbers
+    """
+
+    def __init__(self, num_games, strategies, deck_file, total_turns=500, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.strategies = strategies
+        self.policies = [POLICIES.get(strategy, strategy) for strategy in strategies]
+        num_players = len(strategies)
+        template = np.array(load_card_ids(deck_file), dtype=np.intp)
+
+        # Make sure every colored wild card has an id before the tables are built
+        recolor_ids = {}
+        for i in set(template.tolist()):
+            if CARD_TABLE[i].special in ("wild", "wild-draw-four"):
+                recolor_ids[i] = [card_id(color, None, CARD_TABLE[i].special) for color in UnoGame.COLORS]
+        num_ids = len(CARD_TABLE)
+
+        self.playable = np.array([np.frombuffer(bytes(row[:num_ids]), dtype=np.uint8) for row in PLAYABLE[:num_ids]], dtype=bool)
+        self.special = np.array([SPECIAL_CODES[card.special] for card in CARD_TABLE[:num_ids]], dtype=np.int8)
+        self.recolor = np.tile(np.arange(num_ids)[:, None], (1, len(UnoGame.COLORS)))
+        self.uncolor = np.arange(num_ids)
+        for i, colored in recolor_ids.items():
+            self.recolor[i] = colored
+            for colored_id in colored:
+                self.recolor[colored_id] = colored
+                self.uncolor[colored_id] = i
+
+        self.draw = self.rng.permuted(np.tile(template, (num_games, 1)), axis=1)
+        self.draw_len = np.full(num_games, len(template))
+        self.discard = np.zeros((num_games, num_ids), dtype=np.int16)
+        self.hands = np.zeros((num_games, num_players, num_ids), dtype=np.int16)
+        # Each hand's cards in the order a Hand would hold them, for policies that
+        # care which card came last
+        self.order = np.zeros((num_games, num_players, len(template)), dtype=np.int16)
+        self.order_len = np.zeros((num_games, num_players), dtype=np.intp)
+        self.direction = np.full(num_games, UnoGame.CLOCKWISE)
+        self.current = np.zeros(num_games, dtype=np.intp)
+        self.turns_remaining = np.full(num_games, total_turns)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.winner = np.full(num_games, -1)
+
+        games = np.arange(num_games)
+        self.draw_len -= 1
+        self.top = self.draw[games, self.draw_len]
+        wild = np.isin(self.special[self.top], (WILD, WILD_DRAW_FOUR))
+        self.top[wild] = self.recolor[self.top[wild], self.rng.integers(0, len(UnoGame.COLORS), wild.sum())]
+        self.deal_starting_cards()
+
+    def deal_starting_cards(self):
+        """ Deals START_CARDS to every player, one at a time like UnoGame does
+        """
+        num_games, num_players = self.hands.shape[:2]
+        games = np.arange(num_games)
+        for i in range(UnoGame.START_CARDS):
+            for player in range(num_players):
+                self.deal(games, np.full(num_games, player), 1)
+
+    def deal(self, games, players, n):
+        """ Deals n cards to one player in each of the given games. A game whose deck
+        is empty shuffles its discard pile to become the deck; if both are empty
+        that game stops dealing.
+
+        Args:
+            games (array of int): the games to deal in (each at most once)
+            players (array of int): the player to deal to in each game
+            n (int): number of cards to deal
+        """
+        for i in range(n):
+            for game in games[self.draw_len[games] == 0]:
+                self.reshuffle(game)
+            has_cards = self.draw_len[games] > 0
+            games, players = games[has_cards], players[has_cards]
+            self.draw_len[games] -= 1
+            cards = self.draw[games, self.draw_len[games]]
+            self.hands[games, players, cards] += 1
+            self.order[games, players, self.order_len[games, players]] = cards
+            self.order_len[games, players] += 1
+
+    def remove_from_order(self, games, players, cards):
+        """ Takes the last copy of a card (the one ComputerPlayer would play) out of
+        one player's ordered hand in each of the given games, moving the cards after
+        it down
+
+        Args:
+            games (array of int): the games (each at most once)
+            players (array of int): the player in each game
+            cards (array of int): the card to take out in each game
+        """
+        rows = self.order[games, players]
+        positions = np.arange(rows.shape[1])
+        held = positions < self.order_len[games, players][:, None]
+        found = np.where((rows == cards[:, None]) & held, positions, -1).max(axis=1)
+        source = np.minimum(positions + (positions >= found[:, None]), rows.shape[1] - 1)
+        self.order[games, players] = np.take_along_axis(rows, source, axis=1)
+        self.order_len[games, players] -= 1
+
+    def reshuffle(self, game):
+        """ Shuffles one game's discard pile and makes it the deck
+
+        Args:
+            game (int): the game
+        """
+        cards = np.repeat(np.arange(self.discard.shape[1]), self.discard[game])
+        self.rng.shuffle(cards)
+        self.draw[game, :len(cards)] = cards
+        self.draw_len[game] = len(cards)
+        self.discard[game] = 0
+
+    def next_players(self, games):
+        """ Returns the index of the next player in each game
+        """
+        return (self.current[games] + self.direction[games]) % self.hands.shape[1]
+
+    def step(self):
+        """ Plays one turn of every unfinished game
+
+        Returns:
+            (int) the number of games that were still being played
+        """
+        games = np.flatnonzero(~self.done)
+        if len(games) == 0:
+            return 0
+        players = self.current[games]
+        top = self.top[games]
+        hands = self.hands[games, players]
+        valid = (hands > 0) & self.playable[top]
+        lengths = self.order_len[games, players]
+        last = np.where(lengths > 0, self.order[games, players, np.maximum(lengths - 1, 0)], -1)
+
+        cards = np.full(len(games), -1)
+        colors = np.zeros(len(games), dtype=np.intp)
+        for seat, policy in enumerate(self.policies):
+            mine = players == seat
+            if mine.any():
+                cards[mine], colors[mine] = policy(hands[mine], valid[mine], top[mine], self.rng, last=last[mine])
+
+        drew = cards < 0
+        ok = ~drew & self.playable[top, np.where(drew, 0, cards)]
+        invalid = ~drew & ~ok
+        self.deal(games[drew], players[drew], 1)
+        self.deal(games[invalid], players[invalid], 2)
+
+        played, players, cards, colors = games[ok], players[ok], cards[ok], colors[ok]
+        self.hands[played, players, cards] -= 1
+        self.remove_from_order(played, players, cards)
+        self.discard[played, self.uncolor[self.top[played]]] += 1
+        self.top[played] = cards
+
+        won = self.hands[played, players].sum(axis=1) == 0
+        self.done[played[won]] = True
+        self.winner[played[won]] = players[won]
+        played, cards, colors = played[~won], cards[~won], colors[~won]
+
+        special = self.special[cards]
+        skip = played[special == SKIP]
+        self.current[skip] = self.next_players(skip)
+        reverse = played[special == REVERSE]
+        self.direction[reverse] *= -1
+        for draw_special, n in ((DRAW_TWO, 2), (WILD_DRAW_FOUR, 4)):
+            drawing = played[special == draw_special]
+            self.deal(drawing, self.next_players(drawing), n)
+        wild = np.isin(special, (WILD, WILD_DRAW_FOUR))
+        self.top[played[wild]] = self.recolor[cards[wild], colors[wild]]
+
+        still_playing = games[~self.done[games]]
+        self.current[still_playing] = self.next_players(still_playing)
+        self.turns_remaining[games] -= 1
+        self.done[games[self.turns_remaining[games] <= 0]] = True
+        return len(games)
+
+    def play(self):
+        """ Plays every game to the end
+
+        Returns:
+            (array of int) the winning seat of each game (-1 if nobody won)
+        """
+        while self.step():
+            pass
+        return self.winner
+
+    def win_counts(self):
+        """ Counts wins by player name, using the same names as UnoGame's computer
+        players. Games without a winner count under None.
+
+        Returns:
+            (Counter) wins for each player name
+        """
+        names = ["Computer {} ({})".format(i, strategy if isinstance(strategy, str) else strategy.__name__)
+                 for i, strategy in enumerate(self.strategies)]
+        wins = Counter()
+        for seat, count in zip(*np.unique(self.winner, return_counts=True)):
+            wins[names[seat] if seat >= 0 else None] += int(count)
+        return wins
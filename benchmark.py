@@ -0,0 +1,317 @@
+# benchmark.py
+
+# Timing benchmarks for the Uno engine. Run `python benchmark.py` for all of them
+# or name the ones you want, e.g. `python benchmark.py imports games`.
+#
+# Results are shown next to benchmark_baseline.json, the reference numbers from
+# the machine they were last saved on. Timings depend on the machine, so they are
+# only a rough guide. To check a change for regressions, save a baseline on your
+# own machine first and compare against it: any metric that got more than 20%
+# worse is reported, and the script exits with an error.
+#
+#     python benchmark.py games --save-baseline before.json
+#     python benchmark.py games --baseline before.json
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from statistics import median
+
+from card import Card
+from deck import Deck, DECK_CACHE
+from game import UnoGame
+from rules import RuleSet
+from view import NullView
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "benchmark_baseline.json")
+DECK_FILES = ["uno_cards_basic.csv", "uno_cards_special_no_draw.csv", "uno_cards_special_with_draw.csv"]
+STRATEGIES = ["basic", "random", "strategic"]
+TABLE_SIZES = [2, 10, 50]   # players at the table, for the scaling benchmark
+DECK_COPIES = [4, 16, 64]   # copies of the deck in the shoe (4 is enough to deal to 50 players)
+REGRESSION_THRESHOLD = 0.2
+
+# Modules that are slow to import and should only load when they are used
+HEAVY_MODULES = ["simple_term_menu", "numpy"]
+
+
+def rate(function, seconds=0.5, rounds=3):
+    """ Calls a function over and over for about `seconds` seconds, split into
+    rounds. The best round is used, so other work on the machine matters less.
+
+    Args:
+        function (function): the code to time. It takes no arguments.
+        seconds (float): how long to keep calling it
+        rounds (int): how many rounds to split the time into
+
+    Returns:
+        (float) calls per second
+    """
+    best = 0
+    for round_num in range(rounds):
+        calls = 0
+        batch = 1
+        start = time.perf_counter()
+        while True:
+            for i in range(batch):
+                function()
+            calls += batch
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds / rounds:
+                break
+            batch *= 2
+        best = max(best, calls / elapsed)
+    return best
+
+
+def time_import(statement, repeat=5):
+    """ Times a fresh Python process running an import statement, minus the
+    time it takes to start Python at all.
+
+    Args:
+        statement (str): the code to run, e.g. "import game"
+        repeat (int): how many processes to time (the median is used)
+
+    Returns:
+        (float) seconds spent on the import
+    """
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=HERE, check=True)
+        return time.perf_counter() - start
+
+    startup = median(run("pass") for i in range(repeat))
+    return median(run(statement) for i in range(repeat)) - startup
+
+
+def heavy_modules_loaded(statement):
+    """ Lists the HEAVY_MODULES loaded by an import statement
+
+    Args:
+        statement (str): the code to run, e.g. "import game"
+
+    Returns:
+        (list of str) the heavy modules that were imported
+    """
+    code = "{}\nimport sys\nprint(' '.join(m for m in {!r} if m in sys.modules))".format(statement, HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, check=True, capture_output=True, text=True)
+    return result.stdout.split()
+
+
+def bench_imports(seconds, repeat=5):
+    """ Reports how long the main modules take to import. Worker processes import
+    these every time they start, so this should stay in milliseconds.
+    """
+    results = {}
+    for module in ["card", "deck", "player", "view", "game", "tournament"]:
+        statement = "import {}".format(module)
+        results["import {} (ms)".format(module)] = time_import(statement, repeat) * 1000
+        heavy = heavy_modules_loaded(statement)
+        if heavy:
+            print("  import {} loads {}".format(module, ", ".join(heavy)))
+    return results
+
+
+def bench_deck(seconds):
+    """ Reports how fast decks are loaded (from the cache and from the file) and shuffled
+    """
+    results = {}
+    for deck_file in DECK_FILES:
+        deck = Deck(deck_file)
+        results["load {} (decks/s)".format(deck_file)] = rate(lambda: deck.read_cards_from_file(deck_file), seconds)
+
+        def parse():
+            DECK_CACHE.clear()
+            deck.read_cards_from_file(deck_file)
+        results["parse {} (decks/s)".format(deck_file)] = rate(parse, seconds)
+        results["shuffle {} (decks/s)".format(deck_file)] = rate(deck.shuffle_deck, seconds)
+    return results
+
+
+def bench_deal(seconds):
+    """ Reports how fast cards are dealt, with and without shuffling the discard
+    pile back into the deck
+    """
+    game = UnoGame(NullView(), None, ["basic"] * 3, DECK_FILES[-1], seed=0)
+    player = game.players[0]
+    all_cards = game.deck.to_bytes()[0]
+
+    def deal():
+        if game.deck.get_num_cards() < 7:
+            game.deck.load(all_cards, b"")
+        player.hand.ids = player.hand.ids[:0]
+        game.deal_n_cards(7, player)
+
+    def deal_with_reshuffle():
+        game.deck.load(b"", all_cards)
+        player.hand.ids = player.hand.ids[:0]
+        game.deal_n_cards(7, player)
+
+    return {
+        "deal 7 cards (deals/s)": rate(deal, seconds),
+        "deal 7 cards after reshuffle (deals/s)": rate(deal_with_reshuffle, seconds),
+    }
+
+
+def bench_valid_moves(seconds):
+    """ Reports how fast valid cards are found in a hand
+    """
+    game = UnoGame(NullView(), None, ["basic"] * 3, DECK_FILES[-1], seed=0)
+    player = game.players[0]
+    game.deal_n_cards(15, player)
+    game.top_card = Card("red", 5)
+    card = player.hand[0]
+    return {
+        "valid_card_choice (checks/s)": rate(lambda: game.valid_card_choice(card), seconds),
+        "get_valid_card_choices_from_hand, 15 cards (hands/s)":
+            rate(lambda: player.get_valid_card_choices_from_hand(game.top_card), seconds),
+    }
+
+
+def play_games(deck_file, strategy, seconds):
+    """ Plays whole games between three players with the same strategy for about
+    `seconds` seconds
+
+    Returns:
+        (float, float) games per second and turns per second
+    """
+    games = turns = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        game = UnoGame(NullView(), None, [strategy] * 3, deck_file, 500, seed=games)
+        game.play()
+        games += 1
+        turns += 500 - game.turns_remaining
+    elapsed = time.perf_counter() - start
+    return games / elapsed, turns / elapsed
+
+
+def bench_games(seconds):
+    """ Reports games/sec, turns/sec and peak memory of a game for each deck and strategy
+    """
+    results = {}
+    for deck_file in DECK_FILES:
+        for strategy in STRATEGIES:
+            name = "{} {}".format(strategy, deck_file)
+            results["{} (games/s)".format(name)], results["{} (turns/s)".format(name)] = \
+                play_games(deck_file, strategy, seconds)
+            tracemalloc.start()
+            UnoGame(NullView(), None, [strategy] * 3, deck_file, 500, seed=0).play()
+            results["{} peak memory (KB)".format(name)] = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+    return results
+
+
+def bench_scaling(seconds):
+    """ Reports how long a turn takes as the table and the shoe grow. Dealing,
+    reshuffling and moving to the next player don't depend on either, so the
+    times should stay about the same. Setting up the game isn't timed.
+    """
+    results = {}
+    for num_players in TABLE_SIZES:
+        for copies in DECK_COPIES:
+            rules = RuleSet(deck_copies=copies)
+            games = turns = 0
+            elapsed = 0
+            while elapsed < seconds:
+                game = UnoGame(NullView(), None, ["random"] * num_players, DECK_FILES[-1], 500, seed=games, rules=rules)
+                game.deal_starting_cards()
+                start = time.perf_counter()
+                game.play_turns()
+                elapsed += time.perf_counter() - start
+                turns += 500 - game.turns_remaining
+                games += 1
+            results["{} players, {} decks (us/turn)".format(num_players, copies)] = elapsed / turns * 1e6
+    return results
+
+
+BENCHMARKS = {
+    "imports": bench_imports,
+    "deck": bench_deck,
+    "deal": bench_deal,
+    "valid_moves": bench_valid_moves,
+    "games": bench_games,
+    "scaling": bench_scaling,
+}
+
+
+def is_regression(metric, value, baseline):
+    """ Whether a result is more than REGRESSION_THRESHOLD worse than the baseline.
+    Rates ("/s") should go up; times and memory should go down.
+    """
+    if metric.endswith("/s)"):
+        return value < baseline * (1 - REGRESSION_THRESHOLD)
+    return value > baseline * (1 + REGRESSION_THRESHOLD)
+
+
+def read_results(filename):
+    """ Reads results saved with --save-baseline, or returns {} if there are none
+    """
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as results_file:
+        return json.load(results_file)
+
+
+def run_benchmarks(names, seconds, reference, baseline):
+    """ Runs benchmarks, printing each result next to the reference numbers and
+    the baseline
+
+    Args:
+        names (list of str): the benchmarks to run
+        seconds (float): roughly how long to time each measurement
+        reference (dict): the reference numbers, only shown
+        baseline (dict): results of an earlier run on this machine, checked for regressions
+
+    Returns:
+        (dict, list of str) all the results and the metrics that regressed
+    """
+    results = {}
+    regressions = []
+    for name in names:
+        print("[{}]".format(name))
+        for metric, value in BENCHMARKS[name](seconds).items():
+            results[metric] = value
+            line = "  {:<60} {:>12.1f}".format(metric, value)
+            if metric in reference:
+                line += "  ({:+.0%} vs reference)".format(value / reference[metric] - 1)
+            if metric in baseline:
+                line += "  ({:+.0%} vs baseline)".format(value / baseline[metric] - 1)
+                if is_regression(metric, value, baseline[metric]):
+                    line += "  REGRESSION"
+                    regressions.append(metric)
+            print(line)
+    return results, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Uno engine.")
+    parser.add_argument("benchmarks", nargs="*", help="benchmarks to run: {} (default: all)".format(", ".join(BENCHMARKS)))
+    parser.add_argument("--seconds", type=float, default=0.5, help="time spent on each measurement")
+    parser.add_argument("--baseline", help="results saved on this machine to check for regressions against")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE_FILE, metavar="FILE",
+                        help="save the results to FILE (the reference numbers if no FILE is given)")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark: {}".format(name))
+    if args.baseline and not os.path.exists(args.baseline):
+        parser.error("no baseline saved at {}".format(args.baseline))
+
+    reference = read_results(BASELINE_FILE)
+    baseline = read_results(args.baseline) if args.baseline else {}
+    results, regressions = run_benchmarks(args.benchmarks or list(BENCHMARKS), args.seconds, reference, baseline)
+
+    if args.save_baseline:
+        saved = read_results(args.save_baseline)
+        saved.update(results)
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(saved, baseline_file, indent=2, sort_keys=True)
+        print("Saved baseline to {}".format(args.save_baseline))
+    if regressions:
+        print("{} metric(s) regressed by more than {:.0%}".format(len(regressions), REGRESSION_THRESHOLD))
+        sys.exit(1)
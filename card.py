@@ -3,6 +3,17 @@
 
 #class for uno cards
 
+from array import array
+
+# Every distinct card (color, number, special) gets a small integer id the first
+# time it is seen. Hands and piles store these ids instead of Card objects.
+CARD_TABLE = []   # id -> Card
+CARD_IDS = {}     # (color, number, special) -> id
+CARD_KEYS = []    # id -> (color, number, special)
+PLAYABLE = []     # PLAYABLE[top_id][card_id] is 1 if the card can be played on the top card
+PLAYABLE_IDS = {} # top_id -> ids of the cards that can be played on it, filled in as needed
+MAX_CARD_IDS = 255  # ids are stored in array('B'), and 255 means "no card" in files
+
 class Card(object):
     """A Deck has many Card objects.
 
@@ -12,13 +23,48 @@ class Card(object):
         special (str): type of card if special (i.e. reverse, skip, draw four, wild)
 
     """
+    __slots__ = ("color", "number", "special", "_id")
 
     def __init__(self, color, number, special=None):
         """constructor for new instance of Card
         """
-        self.color = color
-        self.number = number
-        self.special = special
+        self.color = color or None
+        self.number = None if number is None or number == '' else int(number)
+        self.special = special or None
+
+    def __setattr__(self, name, value):
+        """ Forgets the card's id when its color, number or special changes. The
+        cards in the CARD_TABLE are shared by every hand and pile, so they can't be
+        changed.
+        """
+        if name != "_id":
+            card_id = getattr(self, "_id", None)
+            if card_id is not None and CARD_TABLE[card_id] is self:
+                raise AttributeError("{} is shared by every hand and pile and can't be changed; "
+                                     "use with_color() to get a card of another color".format(self))
+        object.__setattr__(self, name, value)
+        if name != "_id":
+            object.__setattr__(self, "_id", None)
+
+    @property
+    def id(self):
+        """ The card's id in the CARD_TABLE
+        """
+        if self._id is None:
+            self._id = card_id(self.color, self.number, self.special)
+        return self._id
+
+    def with_color(self, color):
+        """ Returns the same card with a different color. Used to set (and reset)
+        the color of a wild card without changing the card itself.
+
+        Args:
+            color (str): the new color (None for no color)
+
+        Returns:
+            (Card) the card from the CARD_TABLE
+        """
+        return CARD_TABLE[card_id(color, self.number, self.special)]
 
     def __str__(self):
         """ Defines how the object will be printed
@@ -27,3 +73,279 @@ class Card(object):
             return "{} {}".format(self.color, (self.special or int(self.number)))
         else:
             return self.special
+
+def card_id(color, number, special=None):
+    """ Looks up the id of a card, adding it to the CARD_TABLE if it is new
+
+    Args:
+        color (str): Color of the card
+        number (int): number on the card
+        special (str): type of card if special
+
+    Returns:
+        (int) the card's id
+    """
+    key = (color or None, None if number is None or number == '' else int(number), special or None)
+    try:
+        return CARD_IDS[key]
+    except KeyError:
+        if len(CARD_TABLE) >= MAX_CARD_IDS:
+            raise ValueError("Too many different cards (the limit is {})".format(MAX_CARD_IDS))
+        new_id = len(CARD_TABLE)
+        card = Card(*key)
+        card._id = new_id
+        CARD_TABLE.append(card)
+        CARD_IDS[key] = new_id
+        CARD_KEYS.append(key)
+        for top_id, row in enumerate(PLAYABLE):
+            row.append(playable_on(card, CARD_TABLE[top_id]))
+        PLAYABLE.append(bytearray(playable_on(other, card) for other in CARD_TABLE))
+        PLAYABLE_IDS.clear()
+        return new_id
+
+def playable_on(card, top_card):
+    """ The rules of Uno for whether a card can be played on the top card. This is
+    only used to fill in PLAYABLE; use can_play() during a game.
+
+    Args:
+        card (Card): a potentially playable Card
+        top_card (Card): Card at the top of the deck
+
+    Returns:
+        (bool) for whether the card is playable
+    """
+    if card.special == "wild" or card.special == "wild-draw-four":
+        return True
+    return ((top_card.number is not None and top_card.number == card.number) or
+            (top_card.color is not None and top_card.color == card.color) or
+            (top_card.special is not None and top_card.special == card.special))
+
+def can_play(card, top_card):
+    """ Check to see if the card is playable given the top card
+
+    Args:
+        card (Card): a potentially playable Card
+        top_card (Card): Card at the top of the deck
+
+    Returns:
+        (bool) for whether the card is playable
+    """
+    return PLAYABLE[top_card.id][card.id] == 1
+
+def playable_ids(top_id):
+    """ Returns the ids of every card that can be played on a top card
+
+    Args:
+        top_id (int): the top card's id
+
+    Returns:
+        (list of int) the card ids
+    """
+    try:
+        return PLAYABLE_IDS[top_id]
+    except KeyError:
+        ids = PLAYABLE_IDS[top_id] = [i for i, playable in enumerate(PLAYABLE[top_id]) if playable]
+        return ids
+
+def valid_moves(hand, top_card):
+    """ Finds the cards in a hand that can be played on the top card. Each card
+    in the hand appears at most once.
+
+    Args:
+        hand (CardList): the cards to choose from
+        top_card (Card): Card at the top of the deck
+
+    Returns:
+        (list of Card) the playable cards, in hand order
+    """
+    row = PLAYABLE[top_card.id]
+    ids = hand.ids if isinstance(hand, CardList) else [card.id for card in hand]
+    return [CARD_TABLE[i] for i in ids if row[i]]
+
+class CardList():
+    """A list of cards stored as an array of card ids. It behaves like a list of
+    Card objects, handing out the shared Card from the CARD_TABLE for each id.
+
+    Args:
+        cards (list of Card): the starting cards
+    """
+    __slots__ = ("ids",)
+
+    def __init__(self, cards=()):
+        self.ids = array('B', [card.id for card in cards])
+
+    @classmethod
+    def from_ids(cls, ids):
+        """ Creates a CardList from card ids
+
+        Args:
+            ids (iterable of int): the card ids
+        """
+        cards = cls()
+        cards.ids = array('B', ids)
+        return cards
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return (CARD_TABLE[i] for i in self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CardList.from_ids(self.ids[index])
+        return CARD_TABLE[self.ids[index]]
+
+    def __contains__(self, card):
+        return card.id in self.ids
+
+    def __str__(self):
+        return "[{}]".format(", ".join(str(card) for card in self))
+
+    def append(self, card):
+        self.ids.append(card.id)
+
+    def extend_ids(self, ids):
+        """ Adds cards to the end from their ids
+
+        Args:
+            ids (bytes-like): the card ids, e.g. from DrawPile.draw()
+        """
+        self.ids.frombytes(ids)
+
+    def pop(self, index=-1):
+        return CARD_TABLE[self.ids.pop(index)]
+
+    def remove(self, card):
+        self.ids.remove(card.id)
+
+    def index(self, card):
+        return self.ids.index(card.id)
+
+    def copy(self):
+        return CardList.from_ids(self.ids)
+
+class Hand(CardList):
+    """A player's hand. It is a CardList that can also keep an index of what it
+    holds, so strategies can ask how many cards of a color, number or special type
+    they hold without scanning the hand. The index is built the first time it is
+    asked for and kept up to date from then on, so hands nobody asks about cost no
+    more to add to and remove from than a CardList.
+
+    The index is rebuilt if `ids` is replaced with another array (as restoring a
+    game does). Don't change the `ids` array in place.
+
+    Args:
+        cards (list of Card): the starting cards
+    """
+    __slots__ = ("_indexed", "_counts", "_color_counts", "_number_counts", "_special_counts")
+
+    def __init__(self, cards=()):
+        super().__init__(cards)
+        self._indexed = None
+
+    def reindex(self):
+        """ Builds the index from the ids, if it hasn't been built for them yet
+        """
+        if self._indexed is not self.ids:
+            self._indexed = self.ids
+            self._counts = [0] * len(CARD_TABLE)
+            self._color_counts = {}
+            self._number_counts = {}
+            self._special_counts = {}
+            for card_id in self.ids:
+                self.index_card(card_id, 1)
+
+    def index_card(self, card_id, change):
+        """ Adds a card to the index (change=1) or takes it out (change=-1)
+        """
+        counts = self._counts
+        if card_id >= len(counts):
+            counts.extend([0] * (len(CARD_TABLE) - len(counts)))
+        counts[card_id] += change
+        color, number, special = CARD_KEYS[card_id]
+        if color is not None:
+            self._color_counts[color] = self._color_counts.get(color, 0) + change
+        if number is not None:
+            self._number_counts[number] = self._number_counts.get(number, 0) + change
+        if special is not None:
+            self._special_counts[special] = self._special_counts.get(special, 0) + change
+
+    def append(self, card):
+        ids = self.ids
+        ids.append(card.id)
+        if self._indexed is ids:
+            self.index_card(card.id, 1)
+
+    def extend_ids(self, ids):
+        self.ids.frombytes(ids)
+        if self._indexed is self.ids:
+            for card_id in ids:
+                self.index_card(card_id, 1)
+
+    def pop(self, index=-1):
+        ids = self.ids
+        card_id = ids.pop(index)
+        if self._indexed is ids:
+            self.index_card(card_id, -1)
+        return CARD_TABLE[card_id]
+
+    def remove(self, card):
+        ids = self.ids
+        ids.remove(card.id)
+        if self._indexed is ids:
+            self.index_card(card.id, -1)
+
+    @property
+    def counts(self):
+        """ (list of int) the number of copies held of each card, by card id """
+        self.reindex()
+        return self._counts
+
+    @property
+    def color_counts(self):
+        """ (dict) color -> number of cards of that color held """
+        self.reindex()
+        return self._color_counts
+
+    @property
+    def number_counts(self):
+        """ (dict) number -> number of cards with that number held """
+        self.reindex()
+        return self._number_counts
+
+    @property
+    def special_counts(self):
+        """ (dict) special type -> number of cards of that type held """
+        self.reindex()
+        return self._special_counts
+
+    @property
+    def wild_count(self):
+        """ (int) the number of wild and wild-draw-four cards held """
+        special_counts = self.special_counts
+        return special_counts.get("wild", 0) + special_counts.get("wild-draw-four", 0)
+
+    def count(self, card):
+        """ Returns how many copies of a card are in the hand
+        """
+        counts = self.counts
+        card_id = card.id
+        return counts[card_id] if card_id < len(counts) else 0
+
+    def playable_ids(self, top_card):
+        """ Returns the ids of the different cards in hand that can be played on the
+        top card. This looks at the kinds of card that can be played rather than at
+        every card in the hand, so it doesn't get slower as the hand grows.
+
+        Args:
+            top_card (Card): Card at the top of the deck
+
+        Returns:
+            (list of int) card ids, each once
+        """
+        counts = self.counts
+        return [card_id for card_id in playable_ids(top_card.id) if card_id < len(counts) and counts[card_id]]
+
+    def copy(self):
+        return Hand.from_ids(self.ids)
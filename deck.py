@@ -3,9 +3,36 @@
 
 # A deck of Uno cards
 
-from card import Card
-from random import shuffle
-import pandas as pd
+from card import CARD_TABLE, CardList, card_id
+import random
+from array import array
+import csv
+import os
+
+# Parsed decks, shared by every Deck in the process: path -> (mtime, array of card ids)
+DECK_CACHE = {}
+
+def load_card_ids(filename):
+    """ Returns the card ids in a deck file, parsing the file only the first time
+    it is read (or after it changes on disk). Don't modify the returned array.
+
+    Args:
+        filename (str): Path to the file containing uno cards as strings
+
+    Returns:
+        (array of int) the ids of the cards in the file, in file order
+    """
+    path = os.path.abspath(filename)
+    mtime = os.path.getmtime(path)
+    cached = DECK_CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    ids = array('B')
+    with open(path, newline='') as deck_file:
+        for row in csv.DictReader(deck_file):
+            ids.append(card_id(row['color'], row['number'], row['special']))
+    DECK_CACHE[path] = (mtime, ids)
+    return ids
 
 class Deck():
     """Creates a uno Deck object. This reads in cards from a CSV file and stores them
@@ -13,32 +40,33 @@ class Deck():
 
     Args:
         filename (str): Path to the file containing uno cards as strings
-        empty (bool): Whether the deck is generated with or without cards
+        rng (random.Random): where the deck gets random numbers for shuffling (the
+            random module if None)
+        copies (int): how many copies of the file's cards to put in the deck, to
+            make a shoe big enough for a large table
     """
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, rng=None, copies=1):
+        self.rng = rng if rng is not None else random
         if filename:
-            self.cards = self.read_cards_from_file(filename)
+            self.cards = self.read_cards_from_file(filename, copies)
         else:
-            self.cards = []
+            self.cards = CardList()
         self.shuffle_deck()
 
-    def read_cards_from_file(self, filename):
+    def read_cards_from_file(self, filename, copies=1):
         """ Reads cards from text file. Uses basic deck if execption encountered during read.
         Cards should be in the form COLOR,NUMBER,SPECIAL-TYPE (i.e red,1, or red,,draw-four)
 
         Args:
             filename (str): file to look for cards in
+            copies (int): how many times to repeat the file's cards
 
         Returns:
-            list of Card: The list of cards created in the deck
+            CardList: The cards created in the deck
         """
         try:
-            cards = []
-            deckDF = pd.read_csv(filename).fillna('')
-            for index, row in deckDF.iterrows():
-                cards.append(Card(row.color, row.number, row.special))
-            return cards
+            return CardList.from_ids(load_card_ids(filename) * copies)
         except Exception as e:
             print("Exception while reading deck: ", e)
 
@@ -53,7 +81,7 @@ class Deck():
     def shuffle_deck(self):
         """ Shuffles the deck of cards
         """
-        shuffle(self.cards)
+        self.rng.shuffle(self.cards.ids)
 
     def get_top_card(self):
         """ Removes the top card from the deck
@@ -64,3 +92,111 @@ class Deck():
         """ Returns the number of cards left in the deck
         """
         return len(self.cards)
+
+class DrawPile():
+    """The draw pile and the discard pile of a game, kept together in one buffer
+    that is allocated once. Every card in the game is either in a hand, on top of
+    the discard pile, or in this buffer, so the two piles always fit:
+
+        [discard pile ->   ...free...   | draw pile (next card first) ]
+
+    Drawing moves a cursor forward through the draw pile, and when it runs out
+    the discard pile is shuffled and copied to the end of the buffer to become
+    the new draw pile. Nothing is allocated per card.
+
+    Args:
+        cards (array of int): card ids in the deck, the last one drawn first (like
+            Deck.cards.ids)
+        rng (random.Random): where the pile gets random numbers for reshuffling
+            (the random module if None)
+    """
+
+    def __init__(self, cards, rng=None):
+        self.rng = rng if rng is not None else random
+        self.buffer = array('B', cards)
+        self.buffer.reverse()
+        self.view = memoryview(self.buffer)
+        self.cursor = 0        # index of the next card to draw
+        self.num_discards = 0  # the discard pile is buffer[:num_discards]
+
+    def get_num_cards(self):
+        """ Returns the number of cards left in the draw pile
+        """
+        return len(self.buffer) - self.cursor
+
+    def get_num_discards(self):
+        """ Returns the number of cards in the discard pile
+        """
+        return self.num_discards
+
+    def draw(self, n):
+        """ Draws up to n cards. Fewer are drawn if the draw pile runs out.
+
+        Args:
+            n (int): the number of cards to draw
+
+        Returns:
+            (memoryview) the ids of the cards drawn, in the order they were drawn.
+            The view is only valid until the pile is next reshuffled or restored.
+        """
+        start = self.cursor
+        self.cursor = min(start + n, len(self.buffer))
+        return self.view[start:self.cursor]
+
+    def get_top_card(self):
+        """ Draws one card
+
+        Returns:
+            (Card) the card, or None if the draw pile is empty
+        """
+        if self.cursor == len(self.buffer):
+            return None
+        self.cursor += 1
+        return CARD_TABLE[self.buffer[self.cursor - 1]]
+
+    def add_card(self, card):
+        """ Puts a card on the discard pile
+
+        Args:
+            card (Card): the card to discard
+        """
+        self.buffer[self.num_discards] = card.id
+        self.num_discards += 1
+
+    def recycle_discards(self):
+        """ Shuffles the discard pile and turns it into the draw pile. Call this once
+        the draw pile is empty.
+
+        Returns:
+            (bool) False if there were no cards to recycle
+        """
+        n = self.num_discards
+        if n == 0:
+            return False
+        self.rng.shuffle(self.view[:n])
+        # The discard pile is shuffled in the order it was played in, and the last
+        # card played is drawn first
+        self.view[len(self.buffer) - n:] = self.view[n - 1::-1]
+        self.cursor = len(self.buffer) - n
+        self.num_discards = 0
+        return True
+
+    def to_bytes(self):
+        """ Returns the draw pile (the last card drawn first) and the discard pile
+        as bytes, for a GameState
+        """
+        return self.buffer[self.cursor:][::-1].tobytes(), self.buffer[:self.num_discards].tobytes()
+
+    def load(self, cards, discards):
+        """ Replaces both piles, e.g. with the ones from a GameState
+
+        Args:
+            cards (bytes): card ids in the draw pile, the last one drawn first
+            discards (bytes): card ids in the discard pile
+        """
+        if len(cards) + len(discards) > len(self.buffer):
+            raise ValueError("{} cards don't fit in a pile of {}".format(len(cards) + len(discards), len(self.buffer)))
+        self.cursor = len(self.buffer) - len(cards)
+        self.view[self.cursor:] = cards[::-1]
+        self.num_discards = len(discards)
+        self.view[:self.num_discards] = discards
@@ -0,0 +1,280 @@
+# evaluate.py
+
+# Compares computer strategies, playing only as many games as it takes to decide
+#
+# Games are played in batches (in worker processes, like tournament.py) with the
+# players' seats rotated every game, so no strategy gets to go first more often than
+# the others. After every game a sequential probability ratio test (SPRT) checks
+# whether the first strategy's win rate is clearly above or clearly below what we
+# are testing for, and the evaluation stops as soon as it is.
+#
+#     python evaluate.py strategic random --p0 0.25 --p1 0.35
+
+import argparse
+import math
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from game import UnoGame
+from tournament import DEFAULT_DECK, game_seed
+from view import NullView
+
+NO_WINNER = 255
+ACCEPT_H1, ACCEPT_H0 = "H1", "H0"
+
+
+def seat_order(strategies, game_num):
+    """ Returns the strategies in the order they sit in one game. Each game moves
+    everyone one seat along, so over len(strategies) games every strategy sits in
+    every seat once.
+
+    Args:
+        strategies (list of str): the strategies, in the order they were given
+        game_num (int): the index of the game
+
+    Returns:
+        (list of str) the strategy in each seat
+    """
+    shift = game_num % len(strategies)
+    return strategies[shift:] + strategies[:shift]
+
+
+def play_seated_games(deck_file, strategies, total_turns, seed, start, stop):
+    """ Plays the games numbered start to stop with rotated seats. This runs inside
+    a worker process.
+
+    Args:
+        deck_file (str): The filepath to the deck of cards
+        strategies (list of str): strategies for the computer players
+        total_turns (int): the number of turns before a game ends without a winner
+        seed (int): the seed for the whole evaluation
+        start (int): index of the first game to play
+        stop (int): index after the last game to play
+
+    Returns:
+        (array of int) the seat of the winner of each game, in order (NO_WINNER
+        for games without one)
+    """
+    view = NullView()
+    winners = array('B')
+    for game_num in range(start, stop):
+        game = UnoGame(view, None, seat_order(strategies, game_num), deck_file, total_turns, game_seed(seed, game_num))
+        winner = game.play()
+        if winner is None:
+            winners.append(NO_WINNER)
+        else:
+            winners.append([player.name for player in game.players].index(winner))
+    return winners
+
+
+def wilson_interval(wins, games, z=1.96):
+    """ Returns a confidence interval for a win rate. The Wilson score interval
+    stays sensible when there are few games or the rate is near 0 or 1.
+
+    Args:
+        wins (int): games won
+        games (int): games played
+        z (float): the normal quantile for the confidence level (1.96 for 95%)
+
+    Returns:
+        (float, float) the lower and upper bounds
+    """
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    center = (rate + z*z / (2*games)) / (1 + z*z / games)
+    spread = z * math.sqrt(rate * (1 - rate) / games + z*z / (4*games*games)) / (1 + z*z / games)
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+
+class SPRT():
+    """A sequential probability ratio test on a win rate. H0 is that the rate is
+    p0 and H1 that it is p1 (p1 > p0). Add results one game at a time; the test
+    decides once the evidence for one of them is strong enough.
+
+    Args:
+        p0 (float): the win rate under H0
+        p1 (float): the win rate under H1
+        alpha (float): the chance of accepting H1 when H0 is true
+        beta (float): the chance of accepting H0 when H1 is true
+    """
+
+    def __init__(self, p0, p1, alpha=0.05, beta=0.05):
+        if not 0 < p0 < p1 < 1:
+            raise ValueError("SPRT needs 0 < p0 < p1 < 1, not p0={} and p1={}".format(p0, p1))
+        self.p0 = p0
+        self.p1 = p1
+        self.win_llr = math.log(p1 / p0)
+        self.loss_llr = math.log((1 - p1) / (1 - p0))
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+        self.llr = 0.0
+        self.decision = None
+
+    def add(self, won):
+        """ Adds the result of one game
+
+        Args:
+            won (bool): whether the strategy being tested won
+
+        Returns:
+            (str) ACCEPT_H1 or ACCEPT_H0 once the test has decided, otherwise None
+        """
+        self.llr += self.win_llr if won else self.loss_llr
+        if self.llr >= self.upper:
+            self.decision = ACCEPT_H1
+        elif self.llr <= self.lower:
+            self.decision = ACCEPT_H0
+        return self.decision
+
+
+class Evaluation():
+    """The results of an evaluation so far.
+
+    Args:
+        strategies (list of str): the strategies being compared
+        sprt (SPRT): the test on the first strategy's win rate
+    """
+
+    def __init__(self, strategies, sprt):
+        self.strategies = strategies
+        self.sprt = sprt
+        self.wins = [0] * len(strategies)       # by strategy
+        self.seat_wins = [0] * len(strategies)  # by seat
+        self.games = 0
+
+    def add_game(self, game_num, seat):
+        """ Adds the result of one game to the counts and the test
+
+        Args:
+            game_num (int): the index of the game
+            seat (int): the winner's seat, or NO_WINNER
+
+        Returns:
+            (str) the test's decision, if it has made one
+        """
+        self.games += 1
+        player = None
+        if seat != NO_WINNER:
+            player = (seat + game_num) % len(self.strategies)
+            self.wins[player] += 1
+            self.seat_wins[seat] += 1
+        return self.sprt.add(player == 0)
+
+    def decision(self):
+        """ Returns ACCEPT_H1 if the first strategy's win rate is at least p1,
+        ACCEPT_H0 if it is at most p0, or None if the test didn't decide
+        """
+        return self.sprt.decision
+
+    def win_rate(self, player):
+        """ Returns the fraction of games won by one of the strategies
+
+        Args:
+            player (int): the strategy's index in strategies
+        """
+        return self.wins[player] / self.games if self.games else 0.0
+
+    def confidence_interval(self, player, z=1.96):
+        """ Returns a confidence interval for one strategy's win rate (see wilson_interval)
+        """
+        return wilson_interval(self.wins[player], self.games, z)
+
+    def seat_confidence_interval(self, seat, z=1.96):
+        """ Returns a confidence interval for how often the player in a seat wins,
+        whatever their strategy
+        """
+        return wilson_interval(self.seat_wins[seat], self.games, z)
+
+    def __str__(self):
+        lines = ["{} games, decision: {}".format(self.games, self.decision() or "none")]
+        for player, strategy in enumerate(self.strategies):
+            low, high = self.confidence_interval(player)
+            lines.append("  {:<12} {:6.1%}  (95% CI {:.1%} to {:.1%})".format(strategy, self.win_rate(player), low, high))
+        for seat in range(len(self.strategies)):
+            low, high = self.seat_confidence_interval(seat)
+            lines.append("  seat {:<7} {:6.1%}  (95% CI {:.1%} to {:.1%})".format(
+                seat, self.seat_wins[seat] / self.games if self.games else 0.0, low, high))
+        return "\n".join(lines)
+
+
+def evaluate(strategies, p0=None, p1=None, alpha=0.05, beta=0.05, max_games=10000, deck_file=DEFAULT_DECK,
+             total_turns=500, seed=0, workers=None, batch_size=None):
+    """ Tests whether the first strategy wins at least a fraction p1 of games
+    against the others, rather than at most p0, playing games until the test
+    decides or max_games have been played. The result doesn't depend on the
+    number of workers: batches are added in game order and any games played after
+    the test decided are left out.
+
+    Args:
+        strategies (list of str): the strategies to compare; the first is tested
+        p0 (float): the win rate under H0 (defaults to an equal share, 1/len(strategies))
+        p1 (float): the win rate under H1 (defaults to p0 + 0.05)
+        alpha (float): the chance of accepting H1 when H0 is true
+        beta (float): the chance of accepting H0 when H1 is true
+        max_games (int): the most games to play if the test doesn't decide
+        deck_file (str): The filepath to the deck of cards
+        total_turns (int): the number of turns before a game ends without a winner
+        seed (int): the seed for the evaluation. The same seed gives the same result.
+        workers (int): number of worker processes (defaults to one per core)
+        batch_size (int): number of games each worker plays per task
+
+    Returns:
+        (Evaluation) the results
+    """
+    p0 = p0 if p0 is not None else 1 / len(strategies)
+    p1 = p1 if p1 is not None else p0 + 0.05
+    evaluation = Evaluation(list(strategies), SPRT(p0, p1, alpha, beta))
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or 10 * len(strategies)
+
+    def add_batch(start, winners):
+        for game_num, seat in enumerate(winners, start):
+            if evaluation.add_game(game_num, seat):
+                return True
+        return False
+
+    batches = range(0, max_games, batch_size)
+    args = (deck_file, evaluation.strategies, total_turns, seed)
+    if workers == 1:
+        for start in batches:
+            if add_batch(start, play_seated_games(*args, start, min(start + batch_size, max_games))):
+                break
+        return evaluation
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a couple of batches per worker queued, and add them in order
+        pending = deque()
+        starts = iter(batches)
+        decided = False
+        while not decided:
+            for start in islice(starts, 2 * workers - len(pending)):
+                pending.append((start, pool.submit(play_seated_games, *args, start, min(start + batch_size, max_games))))
+            if not pending:
+                break
+            start, future = pending.popleft()
+            decided = add_batch(start, future.result())
+        for start, future in pending:
+            future.cancel()
+    return evaluation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test whether a computer strategy beats the others.")
+    parser.add_argument("strategies", nargs="+", help="computer strategies; the first one is tested")
+    parser.add_argument("--p0", type=float, default=None, help="win rate under H0 (default: an equal share)")
+    parser.add_argument("--p1", type=float, default=None, help="win rate under H1 (default: p0 + 0.05)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="chance of accepting H1 when H0 is true")
+    parser.add_argument("--beta", type=float, default=0.05, help="chance of accepting H0 when H1 is true")
+    parser.add_argument("-n", "--max-games", type=int, default=10000, help="most games to play")
+    parser.add_argument("-f", "--deck", default=DEFAULT_DECK, help="deck file")
+    parser.add_argument("-t", "--turns", type=int, default=500, help="turns before a game ends without a winner")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="evaluation seed")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    print(evaluate(args.strategies, args.p0, args.p1, args.alpha, args.beta, args.max_games, args.deck,
+                   args.turns, args.seed, args.workers))
@@ -0,0 +1,363 @@
+# features.py
+
+# Turns what a player can see into fixed-size NumPy vectors, and plays computer
+# players whose choices come from a neural network
+#
+# Many games are played in lockstep by play_policy_games(): every step, each game
+# whose current player uses the network writes its features into one row of a
+# matrix, and the network chooses for all of them with one pass of matrix
+# multiplies.
+
+from collections import Counter
+
+import numpy as np
+
+from card import CARD_IDS, CARD_TABLE, PLAYABLE
+from game import UnoGame
+from player import ComputerPlayer
+from tournament import DEFAULT_DECK, game_seed
+from view import NullView
+
+# Every card has a slot that doesn't depend on card ids (which are different in
+# each process): 13 slots for each color, then the two wild cards, then one slot
+# shared by every card a custom deck adds
+COLOR_SLOTS = [str(number) for number in range(10)] + ["skip", "reverse", "draw-two"]
+WILD_SLOTS = ["wild", "wild-draw-four"]
+OTHER_SLOT = len(UnoGame.COLORS) * len(COLOR_SLOTS) + len(WILD_SLOTS)
+NUM_SLOTS = OTHER_SLOT + 1
+MAX_OPPONENTS = 9
+SIZE_SCALE = 1 / UnoGame.START_CARDS  # hand sizes are divided by the starting hand size
+
+# Feature vector layout
+HAND = slice(0, NUM_SLOTS)                                          # cards held in each slot
+TOP = slice(HAND.stop, HAND.stop + NUM_SLOTS)                       # the top card's slot
+TOP_COLOR = slice(TOP.stop, TOP.stop + len(UnoGame.COLORS))         # the top card's color
+DIRECTION = TOP_COLOR.stop                                          # 1 clockwise, -1 anticlockwise
+OPPONENTS = slice(DIRECTION + 1, DIRECTION + 1 + MAX_OPPONENTS)     # opponents' hand sizes, in turn order
+DISCARDS = slice(OPPONENTS.stop, OPPONENTS.stop + NUM_SLOTS)        # cards in the discard pile
+DECK_SIZE = DISCARDS.stop                                           # cards left in the deck
+NUM_FEATURES = DECK_SIZE + 1
+
+# Network output layout: a score for playing each slot, for drawing, and for each color
+DRAW_ACTION = NUM_SLOTS
+COLOR_SCORES = slice(NUM_SLOTS + 1, NUM_SLOTS + 1 + len(UnoGame.COLORS))
+NUM_OUTPUTS = COLOR_SCORES.stop
+
+SLOT_TABLE = np.zeros(0, dtype=np.intp)  # card id -> slot, extended as cards are added
+
+
+def card_slot(card):
+    """ Returns a card's slot
+
+    Args:
+        card (Card): the card
+
+    Returns:
+        (int) the slot, from 0 to NUM_SLOTS - 1 (OTHER_SLOT for cards that aren't in
+            the standard deck)
+    """
+    if card.special in WILD_SLOTS:
+        return len(UnoGame.COLORS) * len(COLOR_SLOTS) + WILD_SLOTS.index(card.special)
+    kind = str(card.number) if card.number is not None else card.special
+    if card.color not in UnoGame.COLORS or kind not in COLOR_SLOTS:
+        return OTHER_SLOT
+    return UnoGame.COLORS.index(card.color) * len(COLOR_SLOTS) + COLOR_SLOTS.index(kind)
+
+
+def slot_card_id(slot):
+    """ Returns the id of the (uncolored) card in a slot, if the card exists yet.
+    OTHER_SLOT holds more than one card, so it has none.
+    """
+    if slot == OTHER_SLOT:
+        return None
+    if slot >= len(UnoGame.COLORS) * len(COLOR_SLOTS):
+        return CARD_IDS.get((None, None, WILD_SLOTS[slot - len(UnoGame.COLORS) * len(COLOR_SLOTS)]))
+    color = UnoGame.COLORS[slot // len(COLOR_SLOTS)]
+    kind = COLOR_SLOTS[slot % len(COLOR_SLOTS)]
+    if kind.isdigit():
+        return CARD_IDS.get((color, int(kind), None))
+    return CARD_IDS.get((color, None, kind))
+
+
+def slot_table():
+    """ Returns an array that maps every card id to its slot
+    """
+    global SLOT_TABLE
+    if len(SLOT_TABLE) < len(CARD_TABLE):
+        SLOT_TABLE = np.array([card_slot(card) for card in CARD_TABLE], dtype=np.intp)
+    return SLOT_TABLE
+
+
+def encode_observation(player, top_card, out=None):
+    """ Encodes what a player can see when choosing a card: their hand, the top
+    card, the direction of play, their opponents' hand sizes, the discard pile and
+    the size of the deck.
+
+    Args:
+        player (Player): the player who is choosing. player.game must be set.
+        top_card (Card): the top card currently displayed on the deck
+        out (array [NUM_FEATURES]): where to write the features (a new array if None)
+
+    Returns:
+        (array [NUM_FEATURES]) the features, as float32
+    """
+    if out is None:
+        out = np.zeros(NUM_FEATURES, dtype=np.float32)
+    else:
+        out[:] = 0
+    slots = slot_table()
+    game = player.game
+
+    out[HAND] = np.bincount(slots[np.frombuffer(player.hand.ids, dtype=np.uint8)], minlength=NUM_SLOTS)
+    out[TOP.start + slots[top_card.id]] = 1
+    if top_card.color in UnoGame.COLORS:
+        out[TOP_COLOR.start + UnoGame.COLORS.index(top_card.color)] = 1
+    out[DIRECTION] = game.direction
+
+    players = game.players
+    me = players.index(player)
+    for i in range(1, min(len(players), MAX_OPPONENTS + 1)):
+        out[OPPONENTS.start + i - 1] = len(players[(me + game.direction * i) % len(players)].hand) * SIZE_SCALE
+
+    deck = game.deck
+    discards = np.frombuffer(deck.buffer, dtype=np.uint8, count=deck.get_num_discards())
+    out[DISCARDS] = np.bincount(slots[discards], minlength=NUM_SLOTS)
+    out[DECK_SIZE] = deck.get_num_cards() * SIZE_SCALE
+    return out
+
+
+def playable_mask(player, top_card, out=None):
+    """ Marks the actions a player can take: drawing, or playing a card from their
+    hand that can go on the top card
+
+    Args:
+        player (Player): the player who is choosing
+        top_card (Card): the top card currently displayed on the deck
+        out (array [NUM_SLOTS + 1]): where to write the mask (a new array if None)
+
+    Returns:
+        (array of bool [NUM_SLOTS + 1]) True for the slots that can be played, and for DRAW_ACTION
+    """
+    if out is None:
+        out = np.zeros(NUM_SLOTS + 1, dtype=bool)
+    else:
+        out[:] = False
+    slots = slot_table()
+    row = PLAYABLE[top_card.id]
+    for card_id in player.hand.ids:
+        if row[card_id]:
+            out[slots[card_id]] = True
+    out[DRAW_ACTION] = True
+    return out
+
+
+class PolicyNetwork():
+    """A small fully connected network that scores actions from features, with
+    ReLU between layers. It works on a whole batch of feature vectors at once.
+
+    Args:
+        layer_sizes (list of int): the size of each hidden layer
+        seed (int): seed for the starting weights
+    """
+
+    def __init__(self, layer_sizes=(64,), seed=None):
+        rng = np.random.default_rng(seed)
+        sizes = [NUM_FEATURES] + list(layer_sizes) + [NUM_OUTPUTS]
+        self.weights = [(rng.standard_normal((n_in, n_out)) / np.sqrt(n_in)).astype(np.float32)
+                        for n_in, n_out in zip(sizes, sizes[1:])]
+        self.biases = [np.zeros(n_out, dtype=np.float32) for n_out in sizes[1:]]
+
+    def forward(self, features):
+        """ Scores the actions for a batch of feature vectors
+
+        Args:
+            features (array [batch, NUM_FEATURES]): the features
+
+        Returns:
+            (array [batch, NUM_OUTPUTS]) the scores
+        """
+        x = features
+        for i, (weights, bias) in enumerate(zip(self.weights, self.biases)):
+            x = x @ weights + bias
+            if i < len(self.weights) - 1:
+                np.maximum(x, 0, out=x)
+        return x
+
+    def save(self, filename):
+        """ Writes the weights to a .npz file
+        """
+        arrays = {}
+        for i, (weights, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays["weights_{}".format(i)] = weights
+            arrays["bias_{}".format(i)] = bias
+        np.savez(filename, **arrays)
+
+    @classmethod
+    def load(cls, filename):
+        """ Reads weights written by save()
+        """
+        network = cls(())
+        with np.load(filename) as arrays:
+            num_layers = len(arrays.files) // 2
+            network.weights = [arrays["weights_{}".format(i)] for i in range(num_layers)]
+            network.biases = [arrays["bias_{}".format(i)] for i in range(num_layers)]
+        return network
+
+
+def choose_actions(network, features, masks, rng=None):
+    """ Chooses an action and a color for each row of a batch with one forward
+    pass. Actions that aren't allowed by the mask are never chosen.
+
+    Args:
+        network (PolicyNetwork): the network
+        features (array [batch, NUM_FEATURES]): the features
+        masks (array [batch, NUM_SLOTS + 1]): the allowed actions
+        rng (numpy Generator): if given, actions are sampled (softmax of the scores)
+            instead of taking the best one
+
+    Returns:
+        (array of int, array of int) the chosen slots (DRAW_ACTION to draw) and color indexes
+    """
+    scores = network.forward(features)
+    actions = np.where(masks, scores[:, :NUM_SLOTS + 1], -np.inf)
+    if rng is not None:
+        actions = actions + rng.gumbel(size=actions.shape)
+    return np.argmax(actions, axis=1), np.argmax(scores[:, COLOR_SCORES], axis=1)
+
+
+class PolicyComputerPlayer(ComputerPlayer):
+    """A computer player whose choices come from a PolicyNetwork. It can choose
+    on its own (one row at a time), but is much faster when many games are
+    played together with play_policy_games().
+
+    Args:
+        name (str): the name of the player
+        network (PolicyNetwork): the network that chooses
+        rng (random.Random): not used; the same argument as other computer players
+        sample_rng (numpy Generator): if given, actions are sampled instead of
+            taking the best one
+    """
+
+    def __init__(self, name, network, rng=None, sample_rng=None):
+        super().__init__(name, rng)
+        self.network = network
+        self.sample_rng = sample_rng
+        self.color = UnoGame.COLORS[0]
+
+    def choose_color(self):
+        """Uses the color the network chose along with the card
+        """
+        return self.color
+
+    def choose_card(self, top_card):
+        """ Chooses a card by running the network on this one observation
+
+        Args:
+            top_card (Card): the top card currently displayed on the deck
+
+        Returns:
+            (Card) a valid choice of Card, or None to draw a card
+        """
+        features = encode_observation(self, top_card)[None, :]
+        masks = playable_mask(self, top_card)[None, :]
+        actions, colors = choose_actions(self.network, features, masks, self.sample_rng)
+        return self.take_action(actions[0], colors[0])
+
+    def take_action(self, action, color):
+        """ Removes the chosen card from hand and remembers the chosen color
+
+        Args:
+            action (int): a slot, or DRAW_ACTION
+            color (int): a color index
+
+        Returns:
+            (Card) the card, or None to draw a card
+        """
+        self.color = UnoGame.COLORS[color]
+        if action == DRAW_ACTION:
+            return None
+        if action == OTHER_SLOT:
+            # Custom cards share a slot: play the first one that can go on the top card
+            slots = slot_table()
+            row = PLAYABLE[self.game.top_card.id]
+            card = CARD_TABLE[next(card_id for card_id in self.hand.ids if slots[card_id] == OTHER_SLOT and row[card_id])]
+        else:
+            card = CARD_TABLE[slot_card_id(action)]
+        self.hand.remove(card)
+        return card
+
+
+def play_policy_games(network, strategies, num_games, deck_file=DEFAULT_DECK, total_turns=500, seed=0, sample=False):
+    """ Plays many games in lockstep. Seats with the strategy "policy" get a
+    PolicyComputerPlayer; each step, every game waiting on one of them adds a row to
+    a batch, and the network chooses for the whole batch at once. Other computer
+    players choose as usual.
+
+    Args:
+        network (PolicyNetwork): the network for the "policy" players
+        strategies (list of str): strategies for the computer players
+        num_games (int): how many games to play
+        deck_file (str): The filepath to the deck of cards
+        total_turns (int): the number of turns before a game ends without a winner
+        seed (int): the seed for the games (the same seeds as tournament.py uses)
+        sample (bool): sample actions instead of taking the best one
+
+    Returns:
+        (Counter) wins for each player name (games without a winner count under None)
+    """
+    view = NullView()
+    sample_rng = np.random.default_rng(seed) if sample else None
+    games = []
+    for game_num in range(num_games):
+        game = UnoGame(view, None, strategies, deck_file, total_turns, game_seed(seed, game_num))
+        for i, strategy in enumerate(strategies):
+            if strategy == "policy":
+                player = PolicyComputerPlayer(game.players[i].name, network, sample_rng=sample_rng)
+                player.game = game
+                game.players[i] = player
+        game.deal_starting_cards()
+        games.append(game)
+
+    features = np.zeros((num_games, NUM_FEATURES), dtype=np.float32)
+    masks = np.zeros((num_games, NUM_SLOTS + 1), dtype=bool)
+    wins = Counter()
+    active = games
+    while active:
+        waiting = []
+        still_active = []
+        for game in active:
+            player = game.current_player()
+            view.show_beginning_turn(player, game.top_card)
+            if isinstance(player, PolicyComputerPlayer):
+                encode_observation(player, game.top_card, features[len(waiting)])
+                playable_mask(player, game.top_card, masks[len(waiting)])
+                waiting.append(game)
+            elif finish_turn(game, player, player.choose_card(game.top_card), wins):
+                still_active.append(game)
+
+        if waiting:
+            actions, colors = choose_actions(network, features[:len(waiting)], masks[:len(waiting)], sample_rng)
+            for game, action, color in zip(waiting, actions, colors):
+                player = game.current_player()
+                if finish_turn(game, player, player.take_action(action, color), wins):
+                    still_active.append(game)
+        active = still_active
+    return wins
+
+
+def finish_turn(game, player, card, wins):
+    """ Plays a chosen card in one of play_policy_games()'s games
+
+    Returns:
+        (bool) whether the game goes on
+    """
+    won = game.finish_turn(player, card)
+    game.turns_remaining -= 1
+    if won:
+        game.view.show_winning_game(player)
+        wins[player.name] += 1
+        return False
+    if game.turns_remaining <= 0:
+        wins[None] += 1
+        return False
+    return True
@@ -3,11 +3,14 @@
 
 # Runs the Uno card game
 
-from deck import Deck
-from card import Card
+from deck import Deck, DrawPile
+from card import Card, CardList, CARD_TABLE, can_play
+from state import GameState
 from player import HumanPlayer, ComputerPlayer, RandomComputerPlayer, StrategicComputerPlayer
-from random import choice
+from random import Random
+from array import array
 from view import TerminalView
+from rules import STANDARD_RULES
 import sys, getopt
 
 class UnoGame():
@@ -19,41 +22,114 @@ class UnoGame():
     Args:
         deck_file (str): The filepath to the deck of cards
         total_rounds (int): The number of rounds to play before ending the game
-        human_names (list of str): names of human player (up to 4)
+        human_names (list of str): names of the human players (None if there are none)
         computer_strategies (list of str): names of strategies for computer players ()
+        seed (int): seed for the game's random numbers. Games with the same seed and
+            players are played exactly the same way.
+        rules (RuleSet): the house rules to play by (the standard rules if None)
 
     """
     START_CARDS = 7
-    NUM_PLAYERS = 4
     CLOCKWISE = 1
     ANTICLOCKWISE = -1
     COLORS = ["red", "blue", "green", "yellow"]
 
-    def __init__(self, game_view, human_names, computer_strategies, deck_file=None, total_turns=10):
+    def __init__(self, game_view, human_names, computer_strategies, deck_file=None, total_turns=10, seed=None,
+                 rules=None):
         self.view = game_view
+        self.rules = (rules or STANDARD_RULES).compile()
+        self.START_CARDS = self.rules.start_cards
+        self.NUM_PLAYERS = self.rules.num_players
+        self.pending_draw = 0  # cards waiting for the next player when draws are stacked
+        self.deck_file = deck_file
         self.turns_remaining = total_turns
-        self.deck = Deck(deck_file)
-        self.discard = Deck()
+        self.rng = Random(seed)
+        deck = Deck(deck_file, self.new_rng(), self.rules.deck_copies)
+        self.deck = DrawPile(deck.cards.ids, deck.rng)
+        self.rules.add_cards()  # in case the deck has cards the rules haven't seen
         self.direction = self.CLOCKWISE
         self.current_player_index = 0
         self.top_card = self.deal_one_card()
 
-        if "wild" in self.top_card.special:
-            self.top_card.color = choice(self.COLORS)
+        if self.top_card.special == 'wild' or self.top_card.special == 'wild-draw-four':
+            self.top_card = self.top_card.with_color(self.rng.choice(self.COLORS))
         self.players = []
 
-        if human_names != None:
+        if isinstance(human_names, str):
+            human_names = [human_names]
+        for name in human_names or []:
             self.players.append(HumanPlayer(name))
 
         for i in range(0,len(computer_strategies)):
             if computer_strategies[i] == "random":
-                self.players.append(RandomComputerPlayer("Computer {} ({})".format(i, computer_strategies[i])))
+                self.players.append(RandomComputerPlayer("Computer {} ({})".format(i, computer_strategies[i]), self.new_rng()))
 
             elif computer_strategies[i] == "strategic":
-                self.players.append(StrategicComputerPlayer("Computer {} ({})".format(i, computer_strategies[i])))
+                self.players.append(StrategicComputerPlayer("Computer {} ({})".format(i, computer_strategies[i]), self.new_rng()))
+
+            elif computer_strategies[i] == "montecarlo":
+                from montecarlo import MonteCarloComputerPlayer  # montecarlo imports this module
+                self.players.append(MonteCarloComputerPlayer("Computer {} ({})".format(i, computer_strategies[i]), self.new_rng()))
 
             else:
-                self.players.append(ComputerPlayer("Computer {} ({})".format(i, computer_strategies[i])))
+                self.players.append(ComputerPlayer("Computer {} ({})".format(i, computer_strategies[i]), self.new_rng()))
+
+        for player in self.players:
+            player.game = self
+
+    def new_rng(self):
+        """ Returns a new random number generator seeded from the game's own, so the
+        deck and each player get an independent stream of random numbers.
+        """
+        return Random(self.rng.getrandbits(64))
+
+    def snapshot(self, with_rng=True):
+        """ Saves the state of the game. This is cheap enough to do thousands of times
+        per decision, e.g. to try out moves and then go back.
+
+        Args:
+            with_rng (bool): whether to save the random number generators too. Leave
+                them out when the state only needs to be similar, not an exact replay;
+                saving them is most of the cost.
+
+        Returns:
+            (GameState) the current state of the game
+        """
+        return GameState(
+            *self.deck.to_bytes(),
+            tuple(bytes(player.hand.ids) for player in self.players),
+            self.top_card.id,
+            self.direction,
+            self.current_player_index,
+            self.turns_remaining,
+            (self.rng.getstate(), self.deck.rng.getstate()) + tuple(
+                player.rng.getstate() if hasattr(player, "rng") else None for player in self.players)
+            if with_rng else None,
+            self.pending_draw,
+        )
+
+    def restore(self, state):
+        """ Puts the game back into a saved state. The game must have the same
+        players as the game the state came from.
+
+        Args:
+            state (GameState): a state from snapshot()
+        """
+        self.deck.load(state.deck, state.discard)
+        for player, hand in zip(self.players, state.hands):
+            player.hand.ids = array('B', hand)
+        self.top_card = CARD_TABLE[state.top_card]
+        self.direction = state.direction
+        self.current_player_index = state.current_player_index
+        self.turns_remaining = state.turns_remaining
+        self.pending_draw = state.pending_draw
+        if state.rng_states is None:
+            return
+        self.rng.setstate(state.rng_states[0])
+        self.deck.rng.setstate(state.rng_states[1])
+        for player, rng_state in zip(self.players, state.rng_states[2:]):
+            if rng_state is not None:
+                player.rng.setstate(rng_state)
 
     def play(self):
         """ Plays an uno game
@@ -65,6 +141,21 @@ class UnoGame():
 
         self.deal_starting_cards()
 
+        try:
+            winner = self.play_turns()
+        finally:
+            for player in self.players:
+                player.leave_game()
+        if winner:
+            return winner.name
+
+    def play_turns(self):
+        """ Plays turns until someone wins or there are no turns remaining. Use this
+        instead of play() to carry on from a restored GameState.
+
+        Returns:
+            (Player) the winner, or None if nobody won
+        """
         win = False
 
         while self.turns_remaining > 0 and not win:
@@ -74,13 +165,13 @@ class UnoGame():
         if win:
             winner = self.players[self.current_player_index]
             self.view.show_winning_game(winner)
-            return winner.name
+            return winner
 
     def deal_starting_cards(self):
         """
         Deals cards to all players to begin the games
         """
-        if self.deck.get_num_cards() < self.START_CARDS*self.NUM_PLAYERS:
+        if self.deck.get_num_cards() < self.START_CARDS * (self.NUM_PLAYERS or len(self.players)):
             self.view.show_out_of_cards()
             return False
 
@@ -102,32 +193,111 @@ class UnoGame():
         else:
             card = player.choose_card(self.top_card)
 
+        return self.finish_turn(player, card)
 
+    def finish_turn(self, player, card):
+        """ Plays the card the current player chose (or makes them draw) and moves on
+        to the next player. play_turn() calls this once the player has chosen; it is
+        separate so the choice can come from somewhere else, like a network client.
 
+        Args:
+            player (Player): the current player
+            card (Card): the card they chose, already removed from their hand (None to draw)
 
-        if card:
+        Returns:
+            (bool) whether the game has been won by the current player
+        """
+        if self.pending_draw and not self.rules.can_stack(card, self.top_card):
+            if card:
+                player.add_to_hand(card)
+            self.deal_n_cards(self.pending_draw, player)
+            self.pending_draw = 0
+        elif card:
             self.view.show_played_card(player, card)
             if self.valid_card_choice(card):
-                if self.top_card.special == 'wild' or self.top_card.special == 'wild-draw-four':
-                    self.top_card.color = None   #reseting the color of the wild card before it goes into the discard pile
-                self.discard.add_card(self.top_card)
-                self.top_card = card
-
-                if len(player.hand) == 0:
+                if self.play_card(card):
+                    return True
+                if self.rules.jump_in and self.jump_ins():
                     return True
-                if card.special:
-                    self.special_card_action(card)
-
             else:
                 self.view.show_invalid_card(player, card, self.top_card)
                 player.add_to_hand(card)
                 self.deal_n_cards(2, player)
+        elif self.rules.draw_until_playable:
+            card = self.deal_one_card(player)
+            while card is not None and not can_play(card, self.top_card):
+                card = self.deal_one_card(player)
         else:
             self.deal_n_cards(1, player)
 
         self.increment_player_num()
         return False
 
+    def play_card(self, card):
+        """ Puts a valid card played by the current player on top of the discard pile
+        and does its action
+
+        Args:
+            card (Card): the card, already removed from their hand
+
+        Returns:
+            (bool) whether the current player has won
+        """
+        if self.top_card.special == 'wild' or self.top_card.special == 'wild-draw-four':
+            self.deck.add_card(self.top_card.with_color(None))   #reseting the color of the wild card before it goes into the discard pile
+        else:
+            self.deck.add_card(self.top_card)
+        self.top_card = card
+
+        if len(self.current_player().hand) == 0:
+            return True
+        try:
+            action = self.rules.actions[card.id]
+        except IndexError:
+            action = self.rules.action(card)
+        if action is not None:
+            self.special_card_action(card, action)
+        return False
+
+    def jump_ins(self):
+        """ Lets players who hold the same card as the top card play it out of turn,
+        in turn order starting after the current player. Whoever jumps in becomes the
+        current player.
+
+        Returns:
+            (bool) whether a player who jumped in has won
+        """
+        jumped = True
+        while jumped:
+            jumped = False
+            for i in range(1, len(self.players)):
+                index = (self.current_player_index + self.direction * i) % len(self.players)
+                player = self.players[index]
+                card = player.choose_jump_in(self.top_card)
+                if card is not None:
+                    self.current_player_index = index
+                    self.view.show_played_card(player, card)
+                    if self.play_card(card):
+                        return True
+                    jumped = True
+                    break
+        return False
+
+    def refill_deck(self):
+        """ Makes sure there is a card to draw: if the deck is empty, the discard
+        pile is shuffled and becomes the deck
+
+        Returns:
+            (bool) False if the deck and the discard pile are both empty
+        """
+        if self.deck.get_num_cards() == 0:
+            if self.deck.get_num_discards() == 0:
+                self.view.show_empty_decks()
+                return False
+            self.view.show_shuffling_deck()
+            self.deck.recycle_discards()
+        return True
+
     def deal_n_cards(self, n, player=None):
         """ Takes n cards from the Deck and deals them to a Player or returns the
         Card(s) if no Player is specified.
@@ -138,37 +308,42 @@ class UnoGame():
             player (Player): Player to deal the card (None if no Player)
 
         Returns:
-            Card or list of Card: the drawn card(s)
+            CardList: the drawn card(s) if no Player is specified
         """
-        cards = []
-        for i in range(n):
-            if self.deck.get_num_cards() == 0:
-                if self.discard.get_num_cards() == 0:
-                    self.view.show_empty_decks()
-                    return None
-                self.view.show_shuffling_deck()
-                self.discard.shuffle_deck()
-                empty_deck = self.deck
-                self.deck = self.discard
-                self.discard = empty_deck
-            card = self.deck.get_top_card()
-            cards.append(card)
+        drawn = None if player else CardList()
+        while n > 0:
+            if not self.refill_deck():
+                return drawn
+            cards = self.deck.draw(n)
+            n -= len(cards)
             if player:
-                player.add_to_hand(card)
-                self.view.show_drawing_card(player)
-        return cards
+                player.add_ids_to_hand(cards)
+                for i in range(len(cards)):
+                    self.view.show_drawing_card(player)
+            else:
+                drawn.extend_ids(cards)
+        return drawn
 
     def deal_one_card(self, player=None):
         """Just makes life a little easier.
 
         Args:
             player (Player): optional player to deal the card to
+
+        Returns:
+            Card: the card dealt
         """
-        return self.deal_n_cards(1, player)[0]
+        if not self.refill_deck():
+            return None
+        card = self.deck.get_top_card()
+        if player:
+            player.add_to_hand(card)
+            self.view.show_drawing_card(player)
+        return card
 
     def increment_player_num(self):
         """ Increments/decrements the current_player_index depending on the direction
-        of the game. Resets when number drops below 0 or goes over 3.
+        of the game, wrapping around at either end of the table.
         """
         self.current_player_index = (self.current_player_index + self.direction) % len(self.players)
 
@@ -192,20 +367,16 @@ class UnoGame():
         Returns:
             (bool) for whether the card is playable
         """
-        if card_choice:
-            if card_choice.special == "wild" or card_choice.special == "wild-draw-four":
-                return True
-            if (self.top_card.number and self.top_card.number == card_choice.number) or (self.top_card.color and self.top_card.color == card_choice.color) or (self.top_card.special and self.top_card.special == card_choice.special):
-                return True
-        return False
+        return card_choice is not None and can_play(card_choice, self.top_card)
 
     def wild(self):
         """Allows the current player to change the top card color.
 
-        NOTE: this sets the color of the wild card to the players choice to maintain game state.
+        NOTE: this replaces the top card with the same wild card in the player's chosen color
+        to maintain game state.
         """
         new_color = self.current_player().choose_color()
-        self.top_card.color = new_color
+        self.top_card = self.top_card.with_color(new_color)
 
     def skip(self):
         """ Skips the next player's turn
@@ -217,30 +388,25 @@ class UnoGame():
         """
         self.direction *= -1
 
-    def special_card_action(self, card):
+    def special_card_action(self, card, action=None):
         """ Deals with a special card's action
 
         Args:
             card (Card): they special card that was played
+            action (function): the card's action, if it has already been looked up
         """
-        if card.special == 'wild':
-            self.wild()
-        elif card.special == 'skip':
-            self.skip()
-        elif card.special == 'reverse':
-            self.reverse()
-        elif card.special == 'draw-two':
-            self.draw_two()
-        elif card.special == 'wild-draw-four':
-            self.wild_draw_four()
-
-        ### 💻 YOUR CODE GOES HERE 💻 ###
-        # Edit this function to include calls to your special card functions
-        # The game expects the special cards in the following format: 'wild', 'skip', 'reverse', 'wild-draw-four', 'draw-two'
-
+        # The rules (see rules.py) call wild(), skip(), reverse(), draw_two() and
+        # wild_draw_four() for the standard special cards
+        if action is None:
+            action = self.rules.action(card)
+            if action is None:
+                raise ValueError("UnoGame doesn't know how to play special card: {}".format(card.special))
+        action(self, card)
+        if self.pending_draw:
+            # A stacked draw card: nobody draws until someone doesn't stack
+            self.view.show_stacked_draw(self.current_player(), self.next_player(), self.top_card, self.pending_draw)
         else:
-            raise ValueError("UnoGame doesn't know how to play special card: {}".format(card.special))
-        self.view.show_card_action(self.current_player(), self.next_player(), self.top_card)
+            self.view.show_card_action(self.current_player(), self.next_player(), self.top_card)
 
 
     ### 💻 YOUR CODE GOES HERE 💻 ###
@@ -290,7 +456,7 @@ if __name__ == "__main__":
         computer_strategies.append(view.menu("What strategy should the Computers use? ",["basic","random","strategic"]))
 
 
-    game = UnoGame(view, name, computer_strategies, deck_file, rounds*3)
+    game = UnoGame(view, [name] if name else None, computer_strategies, deck_file, rounds*3)
 
     game.play()
 
@@ -0,0 +1,272 @@
+# montecarlo.py
+
+# A computer player that chooses cards by playing out many random games
+
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from random import Random
+
+from card import CARD_KEYS, CARD_TABLE, card_id
+from game import UnoGame
+from player import ComputerPlayer
+from view import NullView
+
+DRAW = None  # the move for drawing a card instead of playing one
+
+
+def best_color(hand, rng):
+    """ Chooses the color the player holds the most cards of
+
+    Args:
+        hand (Hand): the player's hand
+        rng (random.Random): used to break ties
+
+    Returns:
+        (str) the color
+    """
+    most = max(hand.color_counts.values(), default=0)
+    if not most:
+        return rng.choice(ComputerPlayer.COLORS)
+    return rng.choice(sorted(color for color, count in hand.color_counts.items() if count == most))
+
+
+def determinize(state, me, rng):
+    """ Deals out the cards player `me` can't see at random. The deck and the other
+    players' hands are shuffled together and dealt back with the same sizes, which
+    is a state consistent with everything `me` has observed.
+
+    Args:
+        state (GameState): the real state of the game
+        me (int): index of the player who is looking
+        rng (random.Random): used to shuffle the unseen cards
+
+    Returns:
+        (GameState) a possible state of the game
+    """
+    unseen = bytearray(state.deck)
+    for i, hand in enumerate(state.hands):
+        if i != me:
+            unseen += hand
+    rng.shuffle(unseen)
+    hands = []
+    start = len(state.deck)
+    for i, hand in enumerate(state.hands):
+        if i == me:
+            hands.append(hand)
+        else:
+            hands.append(bytes(unseen[start:start + len(hand)]))
+            start += len(hand)
+    return state.clone(deck=bytes(unseen[:len(state.deck)]), hands=tuple(hands))
+
+
+def translate_ids(state, moves, card_keys):
+    """ Converts the card ids in a state and moves from another process's ids to
+    this process's. Card ids are given out in the order cards are first seen, so
+    they can differ between processes.
+
+    Args:
+        state (GameState): a state using the other process's ids
+        moves (list): card ids (or DRAW) using the other process's ids
+        card_keys (list of tuple): the other process's CARD_KEYS
+
+    Returns:
+        (GameState, list) the state and moves using this process's ids
+    """
+    ids = [card_id(*key) for key in card_keys]
+    table = bytes(ids) + bytes(256 - len(ids))
+    state = state.clone(deck=state.deck.translate(table), discard=state.discard.translate(table),
+                        hands=tuple(hand.translate(table) for hand in state.hands), top_card=ids[state.top_card])
+    return state, [DRAW if move is DRAW else ids[move] for move in moves]
+
+
+class RolloutPlayer(ComputerPlayer):
+    """A player in a rollout. It plays a random valid card and chooses a random
+    color, except that the searching player's stand-in makes the move being tried
+    first.
+    """
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.forced_move = DRAW
+        self.forced = False
+
+    def choose_color(self):
+        if self.forced:
+            self.forced = False
+            return best_color(self.hand, self.rng)
+        return self.rng.choice(self.COLORS)
+
+    def choose_card(self, top_card):
+        if not self.forced:
+            valid_cards = self.get_valid_card_choices_from_hand(top_card)
+            if not valid_cards:
+                return None
+            card = self.rng.choice(valid_cards)
+            self.hand.remove(card)
+            return card
+        if self.forced_move is DRAW:
+            self.forced = False
+            return None
+        card = CARD_TABLE[self.forced_move]
+        self.hand.remove(card)
+        if card.special != "wild" and card.special != "wild-draw-four":
+            self.forced = False
+        return card
+
+
+def run_rollouts(deck_file, state, me, moves, num_rollouts, seed, max_turns, card_keys=None, rules=None):
+    """ Tries each move num_rollouts times (spread evenly), playing each game out
+    with random players from a new determinized state. This is a plain function so
+    it can run in a worker process.
+
+    Args:
+        deck_file (str): The filepath to the deck of cards
+        state (GameState): the real state of the game, before `me` moves
+        me (int): index of the player choosing a move
+        moves (list): card ids to try, or DRAW
+        num_rollouts (int): the number of games to play out
+        seed (int): seed for the rollouts' random numbers
+        max_turns (int): the most turns to play in each rollout
+        card_keys (list of tuple): the CARD_KEYS of the process the state and moves
+            came from, if it isn't this one
+        rules (RuleSet): the rules of the real game
+
+    Returns:
+        (list of int, list of int) wins and rollouts played for each move
+    """
+    if card_keys is not None:
+        state, moves = translate_ids(state, moves, card_keys)
+    rng = Random(seed)
+    sim = UnoGame(NullView(), None, ["basic"] * len(state.hands), deck_file, max_turns, rng.getrandbits(64), rules)
+    for i, other in enumerate(sim.players):
+        sim.players[i] = RolloutPlayer(other.name, sim.new_rng())
+        sim.players[i].game = sim
+    player = sim.players[me]
+
+    wins = [0] * len(moves)
+    plays = [0] * len(moves)
+    for i in range(num_rollouts):
+        move = i % len(moves)
+        sim.restore(determinize(state, me, rng))
+        sim.turns_remaining = min(state.turns_remaining, max_turns)
+        player.forced_move = moves[move]
+        player.forced = True
+        if sim.play_turns() is player:
+            wins[move] += 1
+        plays[move] += 1
+    return wins, plays
+
+
+class MonteCarloComputerPlayer(ComputerPlayer):
+    """MonteCarloComputerPlayer extends the ComputerPlayer class. For each move it
+    could make, it deals out the cards it can't see in ways that fit what it has seen,
+    plays the rest of the game randomly from there many times, and makes the move
+    that won most often.
+
+    Args:
+        name (str): the name of the player
+        rng (random.Random): where the player gets random numbers
+        rollouts (int): the number of games to play out per move
+        time_budget_ms (float): if set, keep playing out games until this much time
+            has passed instead of stopping after `rollouts`
+        max_turns (int): the most turns to play in each rollout
+        workers (int): if set, spread the rollouts over this many workers
+        use_processes (bool): use worker processes instead of threads
+    """
+    BATCH_SIZE = 16
+
+    def __init__(self, name, rng=None, rollouts=64, time_budget_ms=None, max_turns=200, workers=None, use_processes=False):
+        super().__init__(name, rng)
+        self.rollouts = rollouts
+        self.time_budget_ms = time_budget_ms
+        self.max_turns = max_turns
+        self.workers = workers
+        self.use_processes = use_processes
+        self.pool = None
+
+    def choose_color(self):
+        """Chooses the color it holds the most cards of
+        """
+        return best_color(self.hand, self.rng)
+
+    def choose_card(self, top_card):
+        """ Plays out games for each valid card and picks the one that won most often.
+        Drawing is only tried when nothing can be played: it loses much more often,
+        and with few rollouts noise would make it win the search now and then.
+
+        Args:
+            top_card (Card): the top card currently displayed on the deck
+
+        Returns:
+            (Card) a valid choice of Card, or None to draw a card
+        """
+        moves = self.hand.playable_ids(top_card)
+        if not moves:
+            return None
+        if len(moves) == 1:
+            card = CARD_TABLE[moves[0]]
+            self.hand.remove(card)
+            return card
+
+        state = self.game.snapshot(with_rng=False)
+        me = self.game.players.index(self)
+        wins, plays = self.search(state, me, moves)
+        best = max(range(len(moves)), key=lambda i: wins[i] / plays[i] if plays[i] else 0)
+        card = CARD_TABLE[moves[best]]
+        self.hand.remove(card)
+        return card
+
+    def search(self, state, me, moves):
+        """ Runs rollouts in batches until the rollout or time budget is used up
+
+        Returns:
+            (list of int, list of int) wins and rollouts played for each move
+        """
+        if self.time_budget_ms is not None:
+            deadline = time.perf_counter() + self.time_budget_ms / 1000
+            done = lambda rollouts: time.perf_counter() >= deadline
+        else:
+            done = lambda rollouts: rollouts >= self.rollouts
+
+        wins = [0] * len(moves)
+        plays = [0] * len(moves)
+        rollouts = 0
+        while not done(rollouts):
+            batch_size = self.BATCH_SIZE
+            if self.time_budget_ms is None:
+                batch_size = min(batch_size, self.rollouts - rollouts)
+            for batch_wins, batch_plays in self.run_batches(state, me, moves, batch_size):
+                for i in range(len(moves)):
+                    wins[i] += batch_wins[i]
+                    plays[i] += batch_plays[i]
+                rollouts += sum(batch_plays)
+        return wins, plays
+
+    def run_batches(self, state, me, moves, batch_size):
+        """ Runs one batch of rollouts, or one batch per worker if there is a pool
+        """
+        args = (self.game.deck_file, state, me, moves, batch_size)
+        if not self.workers:
+            return [run_rollouts(*args, self.rng.getrandbits(64), self.max_turns, None, self.game.rules.rule_set)]
+        if self.pool is None:
+            if not self.use_processes:
+                # Threads share the card table, so give every card a rollout can make
+                # (wild cards take a color when played) an id before they start
+                for card in CARD_TABLE[:]:
+                    if card.special in ("wild", "wild-draw-four"):
+                        for color in UnoGame.COLORS:
+                            card_id(color, None, card.special)
+            executor = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self.pool = executor(max_workers=self.workers)
+        card_keys = list(CARD_KEYS) if self.use_processes else None  # ids differ between processes
+        futures = [self.pool.submit(run_rollouts, *args, self.rng.getrandbits(64), self.max_turns, card_keys,
+                                    self.game.rules.rule_set)
+                   for i in range(self.workers)]
+        return [future.result() for future in futures]
+
+    def leave_game(self):
+        """ Shuts down the worker pool, if the player started one
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
@@ -3,7 +3,8 @@
 
 # Class for an UnoGame player
 
-from random import shuffle, choice
+import random
+from card import CARD_TABLE, Hand, valid_moves
 
 class Player:
     """A human or computer Player in a UnoGame. This holds the basic details about
@@ -19,7 +20,8 @@ class Player:
         """ Creates a Player object
         """
         self.name = name
-        self.hand = []
+        self.hand = Hand()
+        self.game = None  # the UnoGame sets this when the player joins
 
     def choose_color(self):
         raise NotImplementedError
@@ -27,6 +29,29 @@ class Player:
     def choose_card(self, top_card):
         raise NotImplementedError
 
+    def choose_jump_in(self, top_card):
+        """ Chooses whether to play a card out of turn when the jump-in rule is on.
+        Players don't jump in unless they override this.
+
+        Args:
+            top_card (Card): the card that was just played
+
+        Returns:
+            (Card) a card matching top_card, removed from hand, or None
+        """
+        return None
+
+    def choose_swap_player(self, opponents):
+        """ Chooses who to swap hands with after playing a 7 when the 7-0 rule is on
+
+        Args:
+            opponents (list of Player): the other players
+
+        Returns:
+            (Player) the opponent holding the fewest cards
+        """
+        return min(opponents, key=lambda opponent: len(opponent.hand))
+
     def get_valid_card_choices_from_hand(self, top_card):
         """ Check to see if the card is playable given the top card
 
@@ -34,15 +59,9 @@ class Player:
             top_card (Card): Card at the top of the deck
 
         Returns:
-            (bool) for whether the card is playable
+            (list of Card) the cards in hand that can be played
         """
-        valid_cards = []
-        for card in self.hand:
-            if card.special == "wild" or card.special == "wild-draw-four":
-                valid_cards.append(card)
-            if (top_card.number and top_card.number == card.number) or (top_card.color and top_card.color == card.color) or (top_card.special and top_card.special == card.special):
-                valid_cards.append(card)
-        return valid_cards
+        return valid_moves(self.hand, top_card)
 
     def add_to_hand(self, card):
         """ Adds a card to a player's hand.
@@ -52,6 +71,25 @@ class Player:
         """
         self.hand.append(card)
 
+    def add_ids_to_hand(self, card_ids):
+        """ Adds the cards a player draws to their hand, all at once. A player that
+        overrides add_to_hand gets each card through it instead.
+
+        Args:
+            card_ids (array): the ids of the drawn cards
+        """
+        if type(self).add_to_hand is Player.add_to_hand:
+            self.hand.extend_ids(card_ids)
+        else:
+            for card_id in card_ids:
+                self.add_to_hand(CARD_TABLE[card_id])
+
+    def leave_game(self):
+        """ Called once the game is over, for players that have something to clean
+        up. Players don't need to do anything unless they override this.
+        """
+        pass
+
     def print_hand(self):
         """ Prints the player's current hand to the console
         """
@@ -108,13 +146,36 @@ class ComputerPlayer(Player):
     """ComputerPlayer extends the ComputerPlayer class. A ComputerPlayer can do
     everything a Player can do and more: ComputerPlayer uses a basic (read: bad)
     strategy to make choices during a game.
+
+    Args:
+        name (str): the name of the player
+        rng (random.Random): where the player gets random numbers (a new one if None)
     """
+    COLORS = ["red", "blue", "green", "yellow"]
+
+    def __init__(self, name, rng=None):
+        super().__init__(name)
+        self.rng = rng if rng is not None else random.Random()
 
     def choose_color(self):
         """Asks the player to choose a color
         """
         return "red"
 
+    def choose_jump_in(self, top_card):
+        """ Jumps in whenever it holds the same card as the one just played
+
+        Args:
+            top_card (Card): the card that was just played
+
+        Returns:
+            (Card) a card matching top_card, removed from hand, or None
+        """
+        if not self.hand.count(top_card):
+            return None
+        self.hand.remove(top_card)
+        return top_card
+
     def choose_card(self,top_card):
         """ Plays one turn by choosing the last card from hand.
 
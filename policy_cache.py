@@ -0,0 +1,198 @@
+# policy_cache.py
+
+# Remembers the decisions of deterministic computer players, so the same situation
+# is only ever thought about once
+#
+# A decision is stored under a compact key that describes everything the player
+# can see: the top card, how many stacked draw cards are waiting on them, the
+# cards in their hand (sorted, so their order doesn't matter) and how many cards
+# each opponent holds, in turn order. Only use a cache
+# with players whose choices depend on nothing else -- not with players that use
+# random numbers or the order of their hand -- and use one cache per strategy.
+
+import struct
+from collections import OrderedDict
+
+from card import CARD_TABLE, card_id
+from game import UnoGame
+
+MAGIC = b"UNOPOL2\0"
+NO_CARD = 255   # the decision to draw a card
+NO_COLOR = 255  # no color chosen (yet)
+ENTRY = struct.Struct("<HBB")  # key length, card id, color index
+
+
+def observation_key(player, top_card):
+    """ Returns the compact key for what a player sees when choosing a card
+
+    Args:
+        player (Player): the player who is choosing
+        top_card (Card): the top card currently displayed on the deck
+
+    Returns:
+        (bytes) top card id, cards waiting to be drawn (with stacking), number of
+        opponents, opponents' hand sizes in turn order, then the player's card ids
+        in sorted order
+    """
+    sizes = b""
+    pending_draw = 0
+    game = player.game
+    if game is not None:
+        players = game.players
+        me = game.current_player_index if players[game.current_player_index] is player else players.index(player)
+        sizes = bytes(min(len(players[(me + game.direction * i) % len(players)].hand), 255)
+                      for i in range(1, len(players)))
+        pending_draw = min(game.pending_draw, 255)
+    return bytes((top_card.id, pending_draw, len(sizes))) + sizes + bytes(sorted(player.hand.ids))
+
+
+class PolicyCache():
+    """A table of decisions, keyed by observation_key(), that forgets the least
+    recently used decisions once it holds max_entries. Use attach() to make a
+    player look its decisions up in the table before working them out.
+
+    Args:
+        max_entries (int): the most decisions to keep
+    """
+
+    def __init__(self, max_entries=100000):
+        self.entries = OrderedDict()  # key -> [card id, color index]
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """ Looks up a decision, counting a hit or a miss
+
+        Args:
+            key (bytes): the observation
+
+        Returns:
+            (list) [card id, color index] or None if the decision isn't stored
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, card_id, color=NO_COLOR):
+        """ Stores a decision, forgetting the least recently used one if the
+        cache is full
+
+        Args:
+            key (bytes): the observation
+            card_id (int): the card chosen, or NO_CARD to draw
+            color (int): the index in UnoGame.COLORS of the color chosen after
+                playing a wild card, or NO_COLOR
+
+        Returns:
+            (list) the stored entry, which can be changed to add the color later
+        """
+        entry = self.entries[key] = [card_id, color]
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def hit_rate(self):
+        """ Returns the fraction of lookups that found a decision
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """ Returns the cache's counters as a dict
+        """
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit rate": self.hit_rate()}
+
+    def attach(self, player, key=observation_key):
+        """ Wraps a player's choose_card and choose_color so decisions are looked
+        up in the cache first, and stored in it when they aren't there
+
+        Args:
+            player (ComputerPlayer): the player, which must choose deterministically
+            key (function): makes the key from (player, top_card)
+        """
+        choose_card = player.choose_card
+        choose_color = player.choose_color
+        last = [None]  # the entry for the card just chosen, to add the color to
+
+        def cached_choose_card(top_card):
+            observation = key(player, top_card)
+            entry = self.get(observation)
+            if entry is None:
+                card = choose_card(top_card)
+                entry = self.put(observation, NO_CARD if card is None else card.id)
+            elif entry[0] == NO_CARD:
+                card = None
+            else:
+                card = CARD_TABLE[entry[0]]
+                player.hand.remove(card)
+            last[0] = entry
+            return card
+
+        def cached_choose_color():
+            entry = last[0]
+            if entry is not None and entry[1] != NO_COLOR:
+                return UnoGame.COLORS[entry[1]]
+            color = choose_color()
+            if entry is not None:
+                entry[1] = UnoGame.COLORS.index(color)
+            return color
+
+        player.choose_card = cached_choose_card
+        player.choose_color = cached_choose_color
+
+    def save(self, filename):
+        """ Writes every decision to a file, least recently used first. Card ids
+        are only meaningful in the process that made them, so the card table is
+        saved too.
+
+        Args:
+            filename (str): where to write
+        """
+        with open(filename, "wb") as cache_file:
+            cache_file.write(MAGIC)
+            cards = "\n".join("{},{},{}".format(card.color or "", "" if card.number is None else card.number,
+                                                card.special or "") for card in CARD_TABLE).encode()
+            cache_file.write(struct.pack("<I", len(cards)) + cards)
+            for key, (card, color) in self.entries.items():
+                cache_file.write(ENTRY.pack(len(key), card, color) + key)
+
+    def load(self, filename):
+        """ Adds the decisions in a file written by save(), translating its card ids
+        to this process's ones
+
+        Args:
+            filename (str): the file to read
+        """
+        with open(filename, "rb") as cache_file:
+            data = cache_file.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a policy cache file".format(filename))
+        offset = len(MAGIC)
+        length, = struct.unpack_from("<I", data, offset)
+        offset += 4
+        lines = data[offset:offset + length].decode().split("\n") if length else []
+        ids = [card_id(*line.split(",")) for line in lines]
+        offset += length
+
+        while offset < len(data):
+            key_length, card, color = ENTRY.unpack_from(data, offset)
+            offset += ENTRY.size
+            key = bytearray(data[offset:offset + key_length])
+            offset += key_length
+            # Only the top card and the hand are card ids; the hand has to be sorted again
+            num_sizes = key[2]
+            key[0] = ids[key[0]]
+            key[3 + num_sizes:] = bytes(sorted(ids[i] for i in key[3 + num_sizes:]))
+            self.put(bytes(key), ids[card] if card != NO_CARD else NO_CARD, color)
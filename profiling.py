@@ -0,0 +1,169 @@
+# profiling.py
+
+# Opt-in counters and timers for finding out where an UnoGame spends its time
+
+import json
+import time
+from collections import Counter, defaultdict
+
+from view import ForwardingView
+
+
+def bucket(ns):
+    """ Returns the histogram bucket for a duration: bucket b holds durations
+    under 2**b microseconds (and at least 2**(b-1)).
+    """
+    return (ns // 1000).bit_length()
+
+
+class CountingView(ForwardingView):
+    """Passes every event on to another view, counting the ones the profiler cares
+    about on the way.
+
+    Args:
+        view (View): the game's real view
+        counters (Counter): where to count events
+    """
+
+    def __init__(self, view, counters):
+        super().__init__(view)
+        self.counters = counters
+
+    def show_shuffling_deck(self):
+        self.counters["reshuffles"] += 1
+        self.view.show_shuffling_deck()
+
+    def show_invalid_card(self, player, card, top_card):
+        self.counters["invalid plays"] += 1
+        self.view.show_invalid_card(player, card, top_card)
+
+    def show_empty_decks(self):
+        self.counters["empty decks"] += 1
+        self.view.show_empty_decks()
+
+    def show_winning_game(self, player):
+        self.counters["wins"] += 1
+        self.view.show_winning_game(player)
+
+
+class GameProfiler():
+    """Counts and times what happens in UnoGames. Nothing is measured until the
+    profiler is attached to a game, and games it isn't attached to run exactly as
+    before: attach() wraps the game's and players' methods on those objects only.
+
+    One profiler can be attached to many games; their numbers add up.
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.timers_ns = Counter()
+        self.decision_histograms = defaultdict(Counter)  # player class -> bucket -> count
+
+    def attach(self, game):
+        """ Starts measuring a game. Attach before calling game.play().
+
+        Args:
+            game (UnoGame): the game to measure
+        """
+        self.wrap(game, "play_turn", "turns")
+        self.wrap(game, "deal_n_cards", "deal calls")
+        self.wrap(game, "special_card_action", "special cards")
+
+        deal_n_cards = game.deal_n_cards
+        def counting_deal_n_cards(n, player=None):
+            self.counters["cards dealt"] += n
+            return deal_n_cards(n, player)
+        game.deal_n_cards = counting_deal_n_cards
+
+        for player in game.players:
+            self.wrap_decision(player)
+        game.view = CountingView(game.view, self.counters)
+
+    def detach(self, game):
+        """ Stops measuring a game and puts its methods back
+
+        Args:
+            game (UnoGame): a game the profiler was attached to
+        """
+        for name in ["play_turn", "deal_n_cards", "special_card_action"]:
+            game.__dict__.pop(name, None)
+        for player in game.players:
+            player.__dict__.pop("choose_card", None)
+        if isinstance(game.view, CountingView):
+            game.view = game.view.view
+
+    def wrap(self, game, name, counter):
+        """ Replaces one of the game's methods with one that counts and times calls
+        """
+        method = getattr(game, name)
+        timers_ns = self.timers_ns
+        counters = self.counters
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timers_ns[name] += time.perf_counter_ns() - start
+                counters[counter] += 1
+        setattr(game, name, timed)
+
+    def wrap_decision(self, player):
+        """ Replaces a player's choose_card with one that records how long each
+        decision takes, in a histogram for the player's class
+        """
+        choose_card = player.choose_card
+        histogram = self.decision_histograms[type(player).__name__]
+        timers_ns = self.timers_ns
+
+        def timed_choose_card(*args):
+            start = time.perf_counter_ns()
+            try:
+                return choose_card(*args)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                timers_ns["choose_card"] += elapsed
+                histogram[bucket(elapsed)] += 1
+        player.choose_card = timed_choose_card
+
+    def to_dict(self):
+        """ Returns everything measured so far as plain data. Histogram keys are
+        "<2**b us" labels.
+        """
+        return {
+            "counters": dict(self.counters),
+            "timers_ms": {name: ns / 1e6 for name, ns in self.timers_ns.items()},
+            "decision_latency": {
+                player_class: {"<{}us".format(2**b): count for b, count in sorted(histogram.items())}
+                for player_class, histogram in self.decision_histograms.items()
+            },
+        }
+
+    def merge(self, other):
+        """ Adds the numbers from another profiler, e.g. one from a worker process
+
+        Args:
+            other (GameProfiler): the other profiler
+        """
+        self.counters.update(other.counters)
+        self.timers_ns.update(other.timers_ns)
+        for player_class, histogram in other.decision_histograms.items():
+            self.decision_histograms[player_class].update(histogram)
+
+    def __getstate__(self):
+        return {"counters": self.counters, "timers_ns": self.timers_ns,
+                "decision_histograms": dict(self.decision_histograms)}
+
+    def __setstate__(self, state):
+        self.counters = state["counters"]
+        self.timers_ns = state["timers_ns"]
+        self.decision_histograms = defaultdict(Counter, state["decision_histograms"])
+
+    def dump(self, filename):
+        """ Writes everything measured so far to a JSON file
+
+        Args:
+            filename (str): where to write
+        """
+        with open(filename, "w") as profile_file:
+            json.dump(self.to_dict(), profile_file, indent=2)
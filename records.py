@@ -0,0 +1,235 @@
+# records.py
+
+# Writes a record of every turn of many games to a compact binary file, and reads
+# them back without loading the whole file.
+#
+# File layout: a 16 byte header (magic, number of players, record size) followed by
+# fixed-size records, one per turn plus one for each player who jumps in. The card table (see card.py) is saved next to the
+# file as <filename>.cards.json, because card ids are only meaningful in the process
+# that made them.
+
+import json
+import mmap
+import struct
+from collections import namedtuple
+
+from card import CARD_TABLE, Card
+from view import ForwardingView
+
+MAGIC = b"UNOREC3\0"
+HEADER = struct.Struct("<8sHH4x")
+PLAY, DRAW, INVALID, JUMP_IN = range(4)
+NO_CARD = 255  # card.py never gives out this id
+
+# game number, turn number, player index, action, card id (NO_CARD for DRAW), top card
+# id after the turn, direction, cards the player drew during the turn
+TURN = struct.Struct("<IIBBBBbB")
+Record = namedtuple("Record", ["game", "turn", "player", "action", "card", "top_card", "direction", "drawn",
+                               "hand_sizes"])
+
+
+def record_struct(num_players):
+    """ Returns the struct for one record: TURN followed by each player's hand size
+    """
+    return struct.Struct(TURN.format + "H" * num_players)
+
+
+class RecordWriter():
+    """Appends turn records to a file. Records are packed into a fixed-size buffer
+    that is written out whenever it fills, so memory use doesn't grow with the
+    number of games.
+
+    Args:
+        filename (str): the file to write (it is replaced if it exists)
+        num_players (int): the number of players in every game in the file
+        buffer_records (int): how many records to buffer before writing
+    """
+
+    def __init__(self, filename, num_players, buffer_records=4096):
+        self.filename = filename
+        self.struct = record_struct(num_players)
+        self.num_players = num_players
+        self.buffer = bytearray(self.struct.size * buffer_records)
+        self.buffered = 0
+        self.buffer_records = buffer_records
+        self.file = open(filename, "wb")
+        self.file.write(HEADER.pack(MAGIC, num_players, self.struct.size))
+
+    def write(self, game, turn, player, action, card, top_card, direction, drawn, hand_sizes):
+        """ Adds one turn to the file. See Record for the fields.
+        """
+        self.struct.pack_into(self.buffer, self.buffered * self.struct.size,
+                              game, turn, player, action, card, top_card, direction, min(drawn, 255), *hand_sizes)
+        self.buffered += 1
+        if self.buffered == self.buffer_records:
+            self.flush()
+
+    def flush(self):
+        """ Writes the buffered records to the file
+        """
+        self.file.write(memoryview(self.buffer)[:self.buffered * self.struct.size])
+        self.buffered = 0
+
+    def close(self):
+        """ Writes the remaining records and the card table, and closes the file
+        """
+        self.flush()
+        self.file.close()
+        with open(self.filename + ".cards.json", "w") as cards_file:
+            json.dump([[card.color, card.number, card.special] for card in CARD_TABLE], cards_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameRecorder(ForwardingView):
+    """Records each turn of one UnoGame to a RecordWriter. It sits between the game
+    and its view to see which cards were played and how many were drawn, and wraps
+    the game's play_turn to write a record after every turn. A player who jumps in
+    gets a JUMP_IN record of their own, after the turn's record. Use record_game()
+    to attach one.
+
+    Args:
+        game (UnoGame): the game to record
+        writer (RecordWriter): where to write the records
+        game_num (int): the number to store with the game's records
+    """
+
+    def __init__(self, game, writer, game_num):
+        super().__init__(game.view)
+        self.game = game
+        self.writer = writer
+        self.game_num = game_num
+        self.turn = 0
+        self.plays = []   # [player, card, action] for each card played this turn
+        self.drawn = {}   # player -> cards drawn this turn
+        game.view = self
+        self.play_turn = game.play_turn
+        game.play_turn = self.recorded_play_turn
+
+    def show_played_card(self, player, card):
+        self.plays.append([player, card, PLAY])
+        self.view.show_played_card(player, card)
+
+    def show_invalid_card(self, player, card, top_card):
+        self.plays[-1][2] = INVALID
+        self.view.show_invalid_card(player, card, top_card)
+
+    def show_drawing_card(self, player):
+        self.drawn[player] = self.drawn.get(player, 0) + 1
+        self.view.show_drawing_card(player)
+
+    def recorded_play_turn(self):
+        """ Plays a turn of the game and writes a record of it, and of each jump-in
+        """
+        game = self.game
+        player_index = game.current_player_index
+        player = game.players[player_index]
+        self.plays = []
+        self.drawn = {}
+        won = self.play_turn()
+
+        # Only a card the turn's player played can be jumped in on, so any other
+        # plays come after theirs
+        plays = self.plays
+        action, card = DRAW, NO_CARD
+        if plays and plays[0][0] is player:
+            action, card = plays[0][2], plays[0][1].id
+            plays = plays[1:]
+        top_card, direction = game.top_card.id, game.direction
+        hand_sizes = [len(other.hand) for other in game.players]
+        self.writer.write(self.game_num, self.turn, player_index, action, card, top_card, direction,
+                          self.drawn.get(player, 0), hand_sizes)
+        for other, other_card, other_action in plays:
+            self.writer.write(self.game_num, self.turn, game.players.index(other), JUMP_IN, other_card.id, top_card,
+                              direction, 0, hand_sizes)
+        self.turn += 1
+        return won
+
+
+def record_game(game, writer, game_num):
+    """ Starts recording a game. Call this before game.play().
+
+    Args:
+        game (UnoGame): the game to record
+        writer (RecordWriter): where to write the records
+        game_num (int): the number to store with the game's records
+
+    Returns:
+        (GameRecorder) the recorder
+    """
+    return GameRecorder(game, writer, game_num)
+
+
+class RecordReader():
+    """Reads a file written by a RecordWriter. The file is memory-mapped, so only
+    the records that are used are read from disk, and slices are views of the file
+    rather than copies.
+
+    Args:
+        filename (str): the file to read
+    """
+
+    def __init__(self, filename):
+        self.file = open(filename, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.num_players, record_size = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError("{} is not a game record file".format(filename))
+        self.struct = record_struct(self.num_players)
+        if self.struct.size != record_size:
+            raise ValueError("{} has records of an unexpected size".format(filename))
+        self.cards = None
+        try:
+            with open(filename + ".cards.json") as cards_file:
+                self.cards = [Card(*fields) for fields in json.load(cards_file)]
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return (len(self.map) - HEADER.size) // self.struct.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        fields = self.struct.unpack_from(self.map, HEADER.size + index * self.struct.size)
+        return Record(*fields[:8], fields[8:])
+
+    def __iter__(self):
+        for fields in self.struct.iter_unpack(self.raw(0, len(self))):
+            yield Record(*fields[:8], fields[8:])
+
+    def raw(self, start, stop):
+        """ Returns the bytes of records start to stop without copying them
+
+        Returns:
+            (memoryview) the packed records
+        """
+        size = self.struct.size
+        return memoryview(self.map)[HEADER.size + start * size:HEADER.size + stop * size]
+
+    def as_array(self):
+        """ Returns every record as a NumPy structured array that shares memory
+        with the file (needs numpy).
+        """
+        import numpy as np  # only needed for analysis
+        dtype = np.dtype([("game", "<u4"), ("turn", "<u4"), ("player", "u1"), ("action", "u1"),
+                          ("card", "u1"), ("top_card", "u1"), ("direction", "i1"), ("drawn", "u1"),
+                          ("hand_sizes", "<u2", (self.num_players,))])
+        return np.frombuffer(self.map, dtype=dtype, offset=HEADER.size, count=len(self))
+
+    def card(self, card_id):
+        """ Returns the Card for a card id in this file
+        """
+        if card_id == NO_CARD:
+            return None
+        return self.cards[card_id] if self.cards else CARD_TABLE[card_id]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
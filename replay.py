@@ -0,0 +1,211 @@
+# replay.py
+
+# Records the decisions made in an UnoGame and replays the game to any turn
+#
+# A seeded UnoGame only depends on its players' decisions, so a game can be rebuilt
+# from its deck file, seed, players and a compact list of moves. Each move is one
+# byte: the index of the chosen card in the player's hand (DRAW_MOVE to draw a card),
+# the index of the chosen color in UnoGame.COLORS, and with house rules, the index
+# of the card a player jumps in with (DRAW_MOVE to not jump in) or of the opponent
+# they swap hands with.
+
+from array import array
+from bisect import bisect_right
+
+from game import UnoGame
+from player import ComputerPlayer
+from view import NullView
+
+DRAW_MOVE = 255
+
+
+class MoveLog():
+    """The decisions made by every player in one game, in the order they were made.
+    Use record_moves() to start recording a game.
+
+    Args:
+        moves (bytes): moves recorded earlier, if any
+    """
+
+    def __init__(self, moves=b""):
+        self.moves = array('B', moves)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def to_bytes(self):
+        return self.moves.tobytes()
+
+    def record_player(self, player):
+        """ Wraps a player's choose_card and choose_color so every decision is added
+        to the log
+
+        Args:
+            player (Player): the player to record
+        """
+        choose_card = player.choose_card
+        choose_color = player.choose_color
+        choose_jump_in = player.choose_jump_in
+        choose_swap_player = player.choose_swap_player
+        moves = self.moves
+
+        def record_card(choose):
+            def recorded(*args):
+                hand_before = player.hand.ids[:]
+                card = choose(*args)
+                if card is None:
+                    moves.append(DRAW_MOVE)
+                else:
+                    # Find where the hand changed, so identical cards are told apart
+                    hand = player.hand.ids
+                    index = 0
+                    while index < len(hand) and hand[index] == hand_before[index]:
+                        index += 1
+                    moves.append(index)
+                return card
+            return recorded
+
+        def recorded_choose_color():
+            color = choose_color()
+            moves.append(UnoGame.COLORS.index(color))
+            return color
+
+        def recorded_choose_swap_player(opponents):
+            other = choose_swap_player(opponents)
+            moves.append(opponents.index(other))
+            return other
+
+        player.choose_card = record_card(choose_card)
+        player.choose_color = recorded_choose_color
+        player.choose_jump_in = record_card(choose_jump_in)
+        player.choose_swap_player = recorded_choose_swap_player
+
+
+def record_moves(game):
+    """ Starts recording the decisions made in a game. Call this before game.play().
+
+    Args:
+        game (UnoGame): the game to record
+
+    Returns:
+        (MoveLog) the log, which fills up as the game is played
+    """
+    log = MoveLog()
+    for player in game.players:
+        log.record_player(player)
+    return log
+
+
+class ScriptedPlayer(ComputerPlayer):
+    """A player that makes the moves in a Replay's move log instead of deciding.
+
+    Args:
+        name (str): the name of the player being replayed
+        replay (Replay): the replay to read moves from
+    """
+
+    def __init__(self, name, replay):
+        super().__init__(name)
+        self.replay = replay
+
+    def choose_color(self):
+        return UnoGame.COLORS[self.replay.next_move()]
+
+    def choose_card(self, top_card):
+        move = self.replay.next_move()
+        if move == DRAW_MOVE:
+            return None
+        return self.hand.pop(move)
+
+    def choose_jump_in(self, top_card):
+        return self.choose_card(top_card)
+
+    def choose_swap_player(self, opponents):
+        return opponents[self.replay.next_move()]
+
+
+class Replay():
+    """Rebuilds an UnoGame from its seed and move log and plays it to any turn. A
+    checkpoint is saved every `checkpoint_every` turns the first time the replay
+    gets there, so seeking only replays the turns since the nearest checkpoint.
+
+    Args:
+        deck_file (str): The filepath to the deck of cards
+        seed (int): the game's seed
+        moves (bytes or MoveLog): the game's moves
+        computer_strategies (list of str): the game's computer strategies
+        human_names (list of str): the game's human players, if there were any
+        total_turns (int): the game's number of turns
+        checkpoint_every (int): turns between checkpoints
+        rules (RuleSet): the game's rules (the standard rules if None)
+
+    Attributes:
+        game (UnoGame): the game, at turn `turn`. Inspect it, but change it with
+            seek() and step() only.
+    """
+
+    def __init__(self, deck_file, seed, moves, computer_strategies, human_names=None, total_turns=500, checkpoint_every=64,
+                 rules=None):
+        self.moves = moves.moves if isinstance(moves, MoveLog) else array('B', moves)
+        self.checkpoint_every = checkpoint_every
+        self.game = UnoGame(NullView(), human_names, computer_strategies, deck_file, total_turns, seed, rules)
+        self.game.players = [ScriptedPlayer(player.name, self) for player in self.game.players]
+        for player in self.game.players:
+            player.game = self.game
+        self.move_index = 0
+        self.game.deal_starting_cards()
+        self.turn = 0
+        self.winner = None
+        self.checkpoint_turns = [0]
+        self.checkpoints = [(self.game.snapshot(), self.move_index, self.winner)]
+
+    def next_move(self):
+        """ Returns the next move in the log
+        """
+        if self.move_index >= len(self.moves):
+            raise IndexError("The move log ends at turn {}".format(self.turn))
+        move = self.moves[self.move_index]
+        self.move_index += 1
+        return move
+
+    def finished(self):
+        """ Whether the game is over at the current turn
+        """
+        return self.winner is not None or self.game.turns_remaining <= 0
+
+    def step(self):
+        """ Plays the next turn
+
+        Returns:
+            (bool) False if the game was already over
+        """
+        if self.finished():
+            return False
+        if self.game.play_turn():
+            self.winner = self.game.current_player()
+        self.game.turns_remaining -= 1
+        self.turn += 1
+        if self.turn % self.checkpoint_every == 0 and self.turn > self.checkpoint_turns[-1]:
+            self.checkpoint_turns.append(self.turn)
+            self.checkpoints.append((self.game.snapshot(), self.move_index, self.winner))
+        return True
+
+    def seek(self, turn):
+        """ Puts the game at the start of a turn (after `turn` turns have been played),
+        starting from the nearest checkpoint. Seeking past the end stops at the end.
+
+        Args:
+            turn (int): the turn to go to
+        """
+        i = bisect_right(self.checkpoint_turns, turn) - 1
+        if turn < self.turn or self.checkpoint_turns[i] > self.turn:
+            state, self.move_index, self.winner = self.checkpoints[i]
+            self.game.restore(state)
+            self.turn = self.checkpoint_turns[i]
+        while self.turn < turn and self.step():
+            pass
+
+    def state(self):
+        """ Returns the GameState at the current turn
+        """
+        return self.game.snapshot()
@@ -0,0 +1,195 @@
+# rules.py
+
+# House rules for an UnoGame, compiled into tables the game looks card actions up in
+#
+# A RuleSet is a plain description of the rules, small enough to pickle and send to
+# worker processes. compile() turns it into a CompiledRules once per process: a
+# list, indexed by card id, of the action each card has. The game looks a played
+# card up in that list, so a variant costs nothing on the turns where it doesn't
+# apply.
+#
+#     game = UnoGame(view, None, ["random"] * 4, deck_file, rules=RuleSet(stacking=True, seven_zero=True))
+
+from card import CARD_TABLE
+
+
+def play_wild(game, card):
+    game.wild()
+
+
+def play_skip(game, card):
+    game.skip()
+
+
+def play_reverse(game, card):
+    game.reverse()
+
+
+def play_draw_two(game, card):
+    game.draw_two()
+
+
+def play_wild_draw_four(game, card):
+    game.wild_draw_four()
+
+
+def stack_draw_two(game, card):
+    game.pending_draw += 2
+
+
+def stack_wild_draw_four(game, card):
+    game.pending_draw += 4
+    game.wild()
+
+
+def swap_hands(game, card):
+    """ A 7 swaps the current player's hand with an opponent of their choosing
+    """
+    player = game.current_player()
+    opponents = [other for other in game.players if other is not player]
+    other = player.choose_swap_player(opponents)
+    player.hand, other.hand = other.hand, player.hand
+
+
+def pass_hands(game, card):
+    """ A 0 passes every hand on to the next player in the direction of play
+    """
+    hands = [player.hand for player in game.players]
+    for i, player in enumerate(game.players):
+        player.hand = hands[(i - game.direction) % len(hands)]
+
+
+# The actions of the standard rules, by special type
+SPECIAL_ACTIONS = {
+    "wild": play_wild,
+    "skip": play_skip,
+    "reverse": play_reverse,
+    "draw-two": play_draw_two,
+    "wild-draw-four": play_wild_draw_four,
+}
+
+
+class RuleSet():
+    """The rules an UnoGame is played by. The defaults are the standard rules this
+    lab has always used.
+
+    Args:
+        start_cards (int): the number of cards dealt to each player
+        num_players (int): the number of players the deck must have enough cards to deal
+            to (None for the number of players at the table)
+        deck_copies (int): how many copies of the deck file to shuffle together
+        stacking (bool): a player given a draw-two (or wild-draw-four) can pass it on by
+            playing one of their own. The cards add up, and the first player who doesn't
+            stack draws them all and misses their turn.
+        jump_in (bool): a player holding the same card as the one just played can play
+            it straight away, out of turn. Play carries on from them.
+        seven_zero (bool): playing a 7 swaps hands with another player; playing a 0 passes
+            every hand on in the direction of play
+        draw_until_playable (bool): a player who draws keeps drawing until they draw a
+            card they could play
+        actions (dict): special type -> function(game, card), for special cards the
+            standard rules don't have or to replace their actions
+    """
+
+    def __init__(self, start_cards=7, num_players=None, deck_copies=1, stacking=False, jump_in=False,
+                 seven_zero=False, draw_until_playable=False, actions=None):
+        self.start_cards = start_cards
+        self.num_players = num_players
+        self.deck_copies = deck_copies
+        self.stacking = stacking
+        self.jump_in = jump_in
+        self.seven_zero = seven_zero
+        self.draw_until_playable = draw_until_playable
+        self.actions = dict(actions or {})
+        self.compiled = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["compiled"] = None
+        return state
+
+    def special_actions(self):
+        """ Returns the action for each special type under these rules
+
+        Returns:
+            (dict) special type -> function(game, card)
+        """
+        actions = dict(SPECIAL_ACTIONS)
+        if self.stacking:
+            actions["draw-two"] = stack_draw_two
+            actions["wild-draw-four"] = stack_wild_draw_four
+        actions.update(self.actions)
+        return actions
+
+    def number_actions(self):
+        """ Returns the action for each card number under these rules
+
+        Returns:
+            (dict) number -> function(game, card)
+        """
+        if self.seven_zero:
+            return {7: swap_hands, 0: pass_hands}
+        return {}
+
+    def compile(self):
+        """ Returns the CompiledRules for this rule set, building them the first time
+        """
+        if self.compiled is None:
+            self.compiled = CompiledRules(self)
+        return self.compiled
+
+
+class CompiledRules():
+    """A RuleSet turned into lookup tables. Use RuleSet.compile() to get one.
+
+    Args:
+        rule_set (RuleSet): the rules
+    """
+
+    def __init__(self, rule_set):
+        self.rule_set = rule_set
+        self.start_cards = rule_set.start_cards
+        self.num_players = rule_set.num_players
+        self.deck_copies = rule_set.deck_copies
+        self.stacking = rule_set.stacking
+        self.jump_in = rule_set.jump_in
+        self.draw_until_playable = rule_set.draw_until_playable
+        self.special_actions = rule_set.special_actions()
+        self.number_actions = rule_set.number_actions()
+        self.actions = []  # card id -> function(game, card), or None if the card has no action
+        self.add_cards()
+
+    def add_cards(self):
+        """ Fills in the actions of cards interned since the table was last built
+        """
+        for card in CARD_TABLE[len(self.actions):]:
+            if card.special:
+                self.actions.append(self.special_actions.get(card.special))
+            else:
+                self.actions.append(self.number_actions.get(card.number))
+
+    def action(self, card):
+        """ Returns the action for a card
+
+        Args:
+            card (Card): the card that was played
+
+        Returns:
+            (function) the action, called as action(game, card), or None if the card has none
+        """
+        if card.id >= len(self.actions):
+            self.add_cards()
+        return self.actions[card.id]
+
+    def can_stack(self, card, top_card):
+        """ Returns whether a card passes on the draw cards that are waiting
+
+        Args:
+            card (Card): the card the player chose, or None
+            top_card (Card): the draw card that was played on them
+        """
+        return card is not None and card.special is not None and card.special == top_card.special
+
+
+# The rules used when a game isn't given any
+STANDARD_RULES = RuleSet()
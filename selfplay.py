@@ -0,0 +1,274 @@
+# selfplay.py
+
+# Generates (observation, action, outcome) training samples from computer-only games
+#
+# Games are split into shards of games_per_shard games. Worker processes play one
+# shard at a time and stream its samples to <out_dir>/shard_<n>.samples, a file of
+# fixed-size records (see SAMPLE_DTYPE). A shard's file is written under a temporary
+# name and renamed once it is complete, and checkpoint.json lists the finished
+# shards, so a run that is stopped can be started again with the same arguments
+# and only plays the shards that are missing. manifest.json describes the whole
+# run once it is done.
+#
+#     python selfplay.py samples/ random random random -n 100000 --games-per-shard 1000
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from features import DRAW_ACTION, NUM_FEATURES, card_slot, encode_observation
+from game import UnoGame
+from tournament import DEFAULT_DECK, game_seed
+from view import NullView
+
+NO_COLOR = 255
+WIN, LOSS, NO_WINNER = 1, -1, 0
+
+# One sample: a decision made by one player in one game, and how that game ended
+# for them. Features are stored as float16 to halve the size of the files.
+SAMPLE_DTYPE = np.dtype([("game", "<u4"), ("turn", "<u2"), ("seat", "u1"), ("action", "u1"),
+                         ("color", "u1"), ("outcome", "i1"), ("features", "<f2", (NUM_FEATURES,))])
+
+
+def shard_filename(out_dir, shard):
+    return os.path.join(out_dir, "shard_{:06d}.samples".format(shard))
+
+
+def write_json(filename, data):
+    """ Replaces a JSON file all at once, so it is never left half written
+    """
+    with open(filename + ".tmp", "w") as json_file:
+        json.dump(data, json_file, indent=2)
+    os.replace(filename + ".tmp", filename)
+
+
+class ShardWriter():
+    """Streams samples to one shard file through a fixed-size buffer. The file
+    only gets its real name when close() is called, so a shard that exists is
+    always complete.
+
+    Args:
+        filename (str): the shard's file
+        buffer_samples (int): how many samples to buffer before writing
+    """
+
+    def __init__(self, filename, buffer_samples=16384):
+        self.filename = filename
+        self.buffer = np.zeros(buffer_samples, dtype=SAMPLE_DTYPE)
+        self.buffered = 0
+        self.samples = 0
+        self.file = open(filename + ".tmp", "wb")
+
+    def write(self, samples):
+        """ Adds samples (an array of SAMPLE_DTYPE) to the shard
+        """
+        while len(samples):
+            n = min(len(samples), len(self.buffer) - self.buffered)
+            self.buffer[self.buffered:self.buffered + n] = samples[:n]
+            self.buffered += n
+            samples = samples[n:]
+            if self.buffered == len(self.buffer):
+                self.flush()
+
+    def flush(self):
+        """ Writes the buffered samples to the file
+        """
+        self.file.write(self.buffer[:self.buffered].tobytes())
+        self.samples += self.buffered
+        self.buffered = 0
+
+    def close(self):
+        """ Writes the remaining samples and gives the file its real name
+        """
+        self.flush()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.filename + ".tmp", self.filename)
+
+
+class GameSampler():
+    """Records every decision made in one game at a time. It wraps the players'
+    choose_card and choose_color (like replay.record_moves does), encoding what the
+    player could see before each choice.
+
+    Args:
+        total_turns (int): the most turns a game can last, which bounds its samples
+    """
+
+    def __init__(self, total_turns):
+        self.samples = np.zeros(total_turns, dtype=SAMPLE_DTYPE)
+        self.features = np.zeros(NUM_FEATURES, dtype=np.float32)
+        self.count = 0
+
+    def attach(self, game, game_num):
+        """ Starts recording a game. Call this before game.play().
+        """
+        self.count = 0
+        self.samples["game"] = game_num
+        self.samples["color"] = NO_COLOR
+        for seat, player in enumerate(game.players):
+            self.record_player(player, seat)
+
+    def record_player(self, player, seat):
+        choose_card = player.choose_card
+        choose_color = player.choose_color
+
+        def recorded_choose_card(top_card):
+            sample = self.samples[self.count]
+            encode_observation(player, top_card, self.features)
+            sample["features"] = self.features
+            sample["turn"] = self.count
+            sample["seat"] = seat
+            card = choose_card(top_card)
+            sample["action"] = DRAW_ACTION if card is None else card_slot(card)
+            self.count += 1
+            return card
+
+        def recorded_choose_color():
+            color = choose_color()
+            if self.count:
+                self.samples[self.count - 1]["color"] = UnoGame.COLORS.index(color)
+            return color
+
+        player.choose_card = recorded_choose_card
+        player.choose_color = recorded_choose_color
+
+    def finish(self, winner_seat):
+        """ Fills in the outcome of every decision once the game is over
+
+        Args:
+            winner_seat (int): the seat of the winner, or None if nobody won
+
+        Returns:
+            (array of SAMPLE_DTYPE) the game's samples
+        """
+        samples = self.samples[:self.count]
+        if winner_seat is None:
+            samples["outcome"] = NO_WINNER
+        else:
+            samples["outcome"] = np.where(samples["seat"] == winner_seat, WIN, LOSS)
+        return samples
+
+
+def generate_shard(out_dir, shard, strategies, games_per_shard, deck_file, total_turns, seed, buffer_samples=16384):
+    """ Plays one shard's games and writes their samples. This runs inside a
+    worker process.
+
+    Args:
+        out_dir (str): the run's directory
+        shard (int): the shard number
+        strategies (list of str): strategies for the computer players
+        games_per_shard (int): games in each shard
+        deck_file (str): The filepath to the deck of cards
+        total_turns (int): the number of turns before a game ends without a winner
+        seed (int): the seed for the run
+        buffer_samples (int): samples to buffer before writing
+
+    Returns:
+        (dict) the shard's manifest entry: file name, games, samples and wins per seat
+    """
+    view = NullView()
+    writer = ShardWriter(shard_filename(out_dir, shard), buffer_samples)
+    sampler = GameSampler(total_turns)
+    seat_wins = [0] * len(strategies)
+    start = shard * games_per_shard
+    for game_num in range(start, start + games_per_shard):
+        game = UnoGame(view, None, strategies, deck_file, total_turns, game_seed(seed, game_num))
+        sampler.attach(game, game_num)
+        winner = game.play()
+        winner_seat = None
+        if winner is not None:
+            winner_seat = [player.name for player in game.players].index(winner)
+            seat_wins[winner_seat] += 1
+        writer.write(sampler.finish(winner_seat))
+    writer.close()
+    return {"shard": shard, "file": os.path.basename(writer.filename), "games": games_per_shard,
+            "samples": writer.samples, "seat_wins": seat_wins}
+
+
+def run_selfplay(out_dir, strategies, num_games, games_per_shard=1000, deck_file=DEFAULT_DECK, total_turns=500,
+                 seed=0, workers=None):
+    """ Generates samples from num_games games, resuming an earlier run in out_dir
+    if there is one
+
+    Args:
+        out_dir (str): where to write the shards, checkpoint and manifest
+        strategies (list of str): strategies for the computer players
+        num_games (int): how many games to play (rounded up to whole shards)
+        games_per_shard (int): games in each shard
+        deck_file (str): The filepath to the deck of cards
+        total_turns (int): the number of turns before a game ends without a winner
+        seed (int): the seed for the run. The same seed gives the same samples.
+        workers (int): number of worker processes (defaults to one per core)
+
+    Returns:
+        (dict) the manifest
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    config = {"strategies": list(strategies), "games_per_shard": games_per_shard, "deck_file": deck_file,
+              "total_turns": total_turns, "seed": seed}
+    checkpoint_file = os.path.join(out_dir, "checkpoint.json")
+    checkpoint = {"config": config, "shards": {}}
+    if os.path.exists(checkpoint_file):
+        with open(checkpoint_file) as json_file:
+            checkpoint = json.load(json_file)
+        if checkpoint["config"] != config:
+            raise ValueError("{} has a run with different settings: {}".format(out_dir, checkpoint["config"]))
+
+    num_shards = -(-num_games // games_per_shard)
+    done = checkpoint["shards"]
+    todo = [shard for shard in range(num_shards)
+            if str(shard) not in done or not os.path.exists(shard_filename(out_dir, shard))]
+
+    workers = workers or os.cpu_count() or 1
+    args = (strategies, games_per_shard, deck_file, total_turns, seed)
+    if workers == 1:
+        for shard in todo:
+            done[str(shard)] = generate_shard(out_dir, shard, *args)
+            write_json(checkpoint_file, checkpoint)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(generate_shard, out_dir, shard, *args) for shard in todo]
+            for future in as_completed(futures):
+                entry = future.result()
+                done[str(entry["shard"])] = entry
+                write_json(checkpoint_file, checkpoint)
+
+    shards = [done[str(shard)] for shard in range(num_shards)]
+    manifest = dict(config, dtype=SAMPLE_DTYPE.descr, shards=shards,
+                    games=sum(shard["games"] for shard in shards), samples=sum(shard["samples"] for shard in shards))
+    write_json(os.path.join(out_dir, "manifest.json"), manifest)
+    return manifest
+
+
+def load_shard(filename):
+    """ Returns a shard's samples, memory-mapped rather than read into memory
+
+    Args:
+        filename (str): the shard's file
+
+    Returns:
+        (array of SAMPLE_DTYPE) the samples
+    """
+    return np.memmap(filename, dtype=SAMPLE_DTYPE, mode="r")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate training samples from computer-only Uno games.")
+    parser.add_argument("out_dir", help="directory for the shards, checkpoint and manifest")
+    parser.add_argument("strategies", nargs="+", help="computer strategies (basic, random, strategic or montecarlo)")
+    parser.add_argument("-n", "--games", type=int, default=10000, help="number of games to play")
+    parser.add_argument("--games-per-shard", type=int, default=1000, help="games in each shard file")
+    parser.add_argument("-f", "--deck", default=DEFAULT_DECK, help="deck file")
+    parser.add_argument("-t", "--turns", type=int, default=500, help="turns before a game ends without a winner")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed for the run")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    manifest = run_selfplay(args.out_dir, args.strategies, args.games, args.games_per_shard, args.deck, args.turns,
+                            args.seed, args.workers)
+    print("{} samples from {} games in {} shards".format(manifest["samples"], manifest["games"], len(manifest["shards"])))
@@ -0,0 +1,315 @@
+# server.py
+
+# Hosts many Uno tables at once in one asyncio event loop
+#
+# Every client that connects gets its own table against computer players. Messages
+# are JSON, one per line. The server sends game events, and when it is the client's
+# turn it sends {"event": "your_turn", "turn": n, "hand": [...], "valid": [...], "top": ...}.
+# The client answers with {"turn": n, "play": <index in hand>, "color": "red"} or
+# {"turn": n, "draw": true}. Answers for an earlier turn (one that timed out) are ignored.
+#
+#     python server.py serve --port 8765 --computers random random
+#     python server.py load-test --port 8765 --clients 200
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from game import UnoGame
+from player import Player
+from view import View
+
+
+class RemoteView(View):
+    """Sends game events to a network client as JSON lines.
+
+    Args:
+        writer (asyncio.StreamWriter): the client's connection
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message).encode() + b"\n")
+
+    def show_beginning_turn(self, player, top_card):
+        self.send({"event": "turn", "player": player.name, "top": str(top_card)})
+
+    def show_played_card(self, player, card):
+        self.send({"event": "played", "player": player.name, "card": str(card)})
+
+    def show_drawing_card(self, player):
+        self.send({"event": "drew", "player": player.name})
+
+    def show_invalid_card(self, player, card, top_card):
+        self.send({"event": "invalid", "player": player.name, "card": str(card), "top": str(top_card)})
+
+    def show_shuffling_deck(self):
+        self.send({"event": "shuffle"})
+
+    def show_card_action(self, player, next_player, card):
+        self.send({"event": "action", "player": player.name, "next_player": next_player.name, "card": str(card)})
+
+    def show_stacked_draw(self, player, next_player, card, pending_draw):
+        self.send({"event": "stack", "player": player.name, "next_player": next_player.name, "card": str(card),
+                   "pending_draw": pending_draw})
+
+    def show_winning_game(self, player):
+        self.send({"event": "win", "player": player.name})
+
+
+class RemotePlayer(Player):
+    """A player whose moves come from a network client. Its choices are awaited,
+    so a table waiting on a person doesn't hold up the other tables.
+
+    Args:
+        name (str): the name of the player
+        view (RemoteView): the client's view, used to ask for moves
+        rng (random.Random): where the player gets random numbers (a new one if None)
+    """
+
+    def __init__(self, name, view, rng=None):
+        super().__init__(name)
+        self.view = view
+        self.rng = rng if rng is not None else random.Random()
+        self.moves = asyncio.Queue()
+        self.color = None
+        self.disconnected = False
+        self.turn = 0  # numbers the client's turns, so late answers can be told apart
+
+    async def choose_card_async(self, top_card):
+        """ Asks the client for a move and waits for the answer
+
+        Args:
+            top_card (Card): the top card currently displayed on the deck
+
+        Returns:
+            (Card) the chosen card, removed from hand, or None to draw a card
+        """
+        # Throw away answers that came too late for an earlier turn
+        while not self.moves.empty():
+            self.moves.get_nowait()
+        if self.disconnected:
+            return None
+        self.turn += 1
+        valid = [i for i, card in enumerate(self.hand) if self.game.valid_card_choice(card)]
+        self.view.send({"event": "your_turn", "turn": self.turn, "top": str(top_card),
+                        "hand": [str(card) for card in self.hand], "valid": valid})
+        move = await self.moves.get()
+        while move is not None and move.get("turn", self.turn) != self.turn:
+            move = await self.moves.get()
+        if move is None or "play" not in move:
+            return None
+        index = move["play"]
+        if not isinstance(index, int) or not 0 <= index < len(self.hand):
+            return None
+        self.color = move.get("color")
+        return self.hand.pop(index)
+
+    def choose_color(self):
+        """Uses the color the client sent with its wild card
+        """
+        if self.color in UnoGame.COLORS:
+            return self.color
+        return self.rng.choice(UnoGame.COLORS)
+
+
+class AsyncUnoGame(UnoGame):
+    """An UnoGame that awaits the choices of RemotePlayers. Computer players choose
+    inline, or in a thread pool if offload_computers is set (for slow strategies
+    like montecarlo).
+
+    Args:
+        move_timeout (float): seconds a RemotePlayer has to move before they draw instead
+        offload_computers (bool): run computer players' choices in a thread pool
+        The other arguments are the same as UnoGame.
+    """
+
+    def __init__(self, *args, move_timeout=30, offload_computers=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.move_timeout = move_timeout
+        self.offload_computers = offload_computers
+
+    async def play_async(self):
+        """ Plays an uno game
+
+        Returns:
+            (str) name of the game winner
+        """
+        self.view.setup()
+        self.deal_starting_cards()
+        win = False
+        while self.turns_remaining > 0 and not win:
+            win = await self.play_turn_async()
+            self.turns_remaining -= 1
+        if win:
+            winner = self.current_player()
+            self.view.show_winning_game(winner)
+            return winner.name
+
+    async def play_turn_async(self):
+        """ Plays one round of uno, waiting for the current player's choice
+
+        Returns:
+            (bool) whether the game has been won by the current player
+        """
+        player = self.current_player()
+        self.view.show_beginning_turn(player, self.top_card)
+        if isinstance(player, RemotePlayer):
+            try:
+                card = await asyncio.wait_for(player.choose_card_async(self.top_card), self.move_timeout)
+            except asyncio.TimeoutError:
+                card = None
+        elif self.offload_computers:
+            card = await asyncio.get_running_loop().run_in_executor(None, player.choose_card, self.top_card)
+        else:
+            card = player.choose_card(self.top_card)
+            await asyncio.sleep(0)  # let the other tables run
+        return self.finish_turn(player, card)
+
+
+class UnoServer():
+    """Accepts clients and runs a table for each of them.
+
+    Args:
+        computer_strategies (list of str): the computer players at each table
+        deck_file (str): The filepath to the deck of cards
+        total_turns (int): the number of turns before a game ends without a winner
+        move_timeout (float): seconds a client has to make a move
+        table_timeout (float): seconds before a whole table is shut down
+        offload_computers (bool): run computer players' choices in a thread pool
+    """
+
+    def __init__(self, computer_strategies, deck_file="uno_cards_special_with_draw.csv", total_turns=500,
+                 move_timeout=30, table_timeout=600, offload_computers=False):
+        self.computer_strategies = computer_strategies
+        self.deck_file = deck_file
+        self.total_turns = total_turns
+        self.move_timeout = move_timeout
+        self.table_timeout = table_timeout
+        self.offload_computers = offload_computers
+        self.tables = 0
+        self.games_finished = 0
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """ Accepts clients until cancelled
+        """
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+        """ Runs one table for one client: waits for {"join": name}, then plays a game
+        while passing the client's moves to their RemotePlayer.
+        """
+        view = RemoteView(writer)
+        try:
+            join = json.loads(await asyncio.wait_for(reader.readline(), self.move_timeout) or b"{}")
+        except (asyncio.TimeoutError, ValueError):
+            writer.close()
+            return
+        self.tables += 1
+        game = AsyncUnoGame(view, None, self.computer_strategies, self.deck_file, self.total_turns,
+                            move_timeout=self.move_timeout, offload_computers=self.offload_computers)
+        remote = RemotePlayer(str(join.get("join", "Player")), view, game.new_rng())
+        remote.game = game
+        game.players.insert(0, remote)
+
+        moves = asyncio.ensure_future(self.read_moves(reader, remote))
+        try:
+            winner = await asyncio.wait_for(game.play_async(), self.table_timeout)
+            view.send({"event": "game_over", "winner": winner})
+            self.games_finished += 1
+        except asyncio.TimeoutError:
+            view.send({"event": "game_over", "winner": None, "reason": "table timed out"})
+        finally:
+            moves.cancel()
+            self.tables -= 1
+            writer.close()
+
+    async def read_moves(self, reader, player):
+        """ Passes each line the client sends to its player. After the connection
+        closes, the player draws every turn.
+        """
+        while True:
+            line = await reader.readline()
+            if not line:
+                player.disconnected = True
+                await player.moves.put(None)
+                return
+            try:
+                move = json.loads(line)
+            except ValueError:
+                move = None
+            await player.moves.put(move if isinstance(move, dict) else None)
+
+
+async def load_test_client(host, port, name, stats):
+    """ Plays one game as a client that picks a random valid card (or draws)
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps({"join": name}).encode() + b"\n")
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        message = json.loads(line)
+        if message["event"] == "your_turn":
+            stats["moves"] += 1
+            if message["valid"]:
+                move = {"play": random.choice(message["valid"]), "color": random.choice(UnoGame.COLORS)}
+            else:
+                move = {"draw": True}
+            move["turn"] = message["turn"]
+            writer.write(json.dumps(move).encode() + b"\n")
+        elif message["event"] == "game_over":
+            stats["games"] += 1
+            if message["winner"] == name:
+                stats["wins"] += 1
+    writer.close()
+
+
+async def load_test(host, port, clients):
+    """ Connects many clients at once and reports how fast the server kept up
+
+    Args:
+        host (str): the server's host
+        port (int): the server's port
+        clients (int): the number of clients (and tables)
+
+    Returns:
+        (dict) games finished, moves made, client wins and seconds taken
+    """
+    stats = {"games": 0, "moves": 0, "wins": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(load_test_client(host, port, "Client {}".format(i), stats) for i in range(clients)))
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host Uno tables, or load-test a server.")
+    parser.add_argument("mode", choices=["serve", "load-test"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--computers", nargs="+", default=["random", "random"], help="computer strategies at each table")
+    parser.add_argument("--deck", default="uno_cards_special_with_draw.csv", help="deck file")
+    parser.add_argument("--move-timeout", type=float, default=30, help="seconds a client has to move")
+    parser.add_argument("--table-timeout", type=float, default=600, help="seconds before a table is shut down")
+    parser.add_argument("--offload", action="store_true", help="run computer players in a thread pool")
+    parser.add_argument("--clients", type=int, default=100, help="clients to connect in a load test")
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        server = UnoServer(args.computers, args.deck, move_timeout=args.move_timeout,
+                           table_timeout=args.table_timeout, offload_computers=args.offload)
+        print("Serving Uno tables on {}:{}".format(args.host, args.port))
+        asyncio.run(server.serve(args.host, args.port))
+    else:
+        stats = asyncio.run(load_test(args.host, args.port, args.clients))
+        print("{games} games, {moves} client moves in {seconds:.1f}s ({wins} client wins)".format(**stats))
+        print("{:.0f} client moves/s".format(stats["moves"] / stats["seconds"]))
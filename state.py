@@ -0,0 +1,46 @@
+# state.py
+
+# A compact, immutable copy of everything that changes during an UnoGame
+
+from collections import namedtuple
+
+class GameState(namedtuple("GameState", ["deck", "discard", "hands", "top_card", "direction",
+                                         "current_player_index", "turns_remaining", "rng_states",
+                                         "pending_draw"], defaults=(0,))):
+    """The state of an UnoGame at one moment. Cards are stored as bytes of card ids
+    (see CARD_TABLE in card.py), so a GameState is small, can't be changed, and can
+    be pickled. Card ids are given out per process, in the order cards are first
+    seen, so a GameState sent to another process needs CARD_KEYS sent with it to
+    make sense of its ids (see montecarlo.translate_ids).
+
+    Use UnoGame.snapshot() to make one and UnoGame.restore() to go back to it.
+
+    Args:
+        deck (bytes): card ids in the deck (the last one is drawn next)
+        discard (bytes): card ids in the discard pile
+        hands (tuple of bytes): card ids in each player's hand
+        top_card (int): id of the top card
+        direction (int): UnoGame.CLOCKWISE or UnoGame.ANTICLOCKWISE
+        current_player_index (int): whose turn it is
+        turns_remaining (int): turns left before the game ends
+        rng_states (tuple): states of the game's, deck's and players' random number generators
+            (None if they weren't saved)
+        pending_draw (int): cards waiting for the next player when draws are stacked
+    """
+    __slots__ = ()
+
+    def clone(self, **changes):
+        """ Returns a copy of the state. Because a GameState can't be changed, the
+        copy shares everything with the original except the fields that are changed.
+
+        Args:
+            changes: new values for any of the fields, e.g. turns_remaining=10
+        """
+        if not changes:
+            return self
+        return self._replace(**changes)
+
+    def num_cards(self):
+        """ Returns the number of cards in each player's hand
+        """
+        return [len(hand) for hand in self.hands]
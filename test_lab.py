@@ -17,14 +17,71 @@
 # =============================================================================
 
 import unittest
-import sys, io
-from tqdm import tqdm
 from collections import defaultdict
 
 
 from game import UnoGame
-from card import Card
-from view import TerminalView
+from card import Card, CARD_TABLE
+from view import TerminalView, NullView, EventLogView
+from player import ComputerPlayer
+from rules import RuleSet
+
+
+def seat_random_players(game):
+    """ Replaces a game's computer players with ones that play a random valid card,
+    for tests that need games to be won. RandomComputerPlayer is left for students.
+    """
+    from montecarlo import RolloutPlayer
+    for i, player in enumerate(game.players):
+        game.players[i] = RolloutPlayer(player.name, game.new_rng())
+        game.players[i].game = game
+    return game
+
+
+class LowestCardPlayer(ComputerPlayer):
+    """ Plays the playable card with the lowest id, whatever order its hand is in,
+    so its decisions can be cached
+    """
+
+    def choose_card(self, top_card):
+        card_ids = self.hand.playable_ids(top_card)
+        if not card_ids:
+            return None
+        card = CARD_TABLE[min(card_ids)]
+        self.hand.remove(card)
+        return card
+
+
+def lowest_card_games(seeds, cache=None, view=None, rules=None):
+    """ Sets up three-player games between LowestCardPlayers, sharing a policy cache
+    """
+    games = []
+    for seed in seeds:
+        game = UnoGame(view or NullView(), None, ['basic'] * 3, "uno_cards_special_with_draw.csv", 300, seed=seed, rules=rules)
+        for i, player in enumerate(game.players):
+            game.players[i] = LowestCardPlayer(player.name, game.new_rng())
+            game.players[i].game = game
+            if cache is not None:
+                cache.attach(game.players[i])
+        games.append(game)
+    return games
+
+
+def cached_decisions(filename, first_keys=()):
+    """ Loads a saved policy cache and lists its decisions by card name, so they can
+    be compared between processes. Interning first_keys first gives the cards other ids.
+    """
+    from policy_cache import NO_CARD, PolicyCache
+    for key in first_keys:
+        Card(*key).id
+    cache = PolicyCache()
+    cache.load(filename)
+    decisions = []
+    for key, (card, color) in cache.entries.items():
+        hand = sorted(str(CARD_TABLE[i]) for i in key[3 + key[2]:])
+        decisions.append([str(CARD_TABLE[key[0]]), list(key[1:3 + key[2]]), hand,
+                          None if card == NO_CARD else str(CARD_TABLE[card]), color])
+    return decisions
 
 class TestUnoLab(unittest.TestCase):
 
@@ -81,32 +138,637 @@ class TestUnoLab(unittest.TestCase):
         self.assertTrue(len(next_player.hand) == 4)
 
 
+    def test_house_rules(self):
+        """
+        Test that stacked draw cards add up and that a 7 swaps hands.
+        """
+        game = UnoGame(NullView(), None, ['basic','basic','basic'], "uno_cards_special_with_draw.csv", 10,
+                       rules=RuleSet(stacking=True, seven_zero=True))
+        first, second, third = game.players
+        draw_two = Card("red", None, "draw-two")
+        first.add_to_hand(Card("blue", 1))
+        second.add_to_hand(Card("green", 5))
+        second.add_to_hand(draw_two)
+        game.top_card = Card("red", 3)
+        game.finish_turn(first, draw_two)
+        game.finish_turn(second, second.choose_card(game.top_card))
+        game.finish_turn(third, None)
+        self.assertTrue(len(third.hand) == 4 and game.current_player() is first)
+        game.finish_turn(first, Card("red", 7))
+        self.assertTrue(first.hand.count(Card("green", 5)) == 1 and second.hand.count(Card("blue", 1)) == 1)
+
+
+    def test_draws_go_through_add_to_hand(self):
+        """
+        Test that a player overriding add_to_hand sees every card it draws, not just its starting cards.
+        """
+        game = UnoGame(NullView(), None, ['basic','basic','basic'], "uno_cards_special_with_draw.csv", 10)
+        player = game.players[0]
+        added = []
+        class CountingPlayer(ComputerPlayer):
+            def add_to_hand(self, card):
+                added.append(card)
+                super().add_to_hand(card)
+        player.__class__ = CountingPlayer
+        game.deal_starting_cards()
+        game.deal_n_cards(3, player)
+        self.assertTrue(len(added) == len(player.hand) == 10)
+
+
+    def test_large_table(self):
+        """
+        Test that a big table is dealt from a shoe of several decks.
+        """
+        game = UnoGame(NullView(), ["Human"], ['random'] * 19, "uno_cards_special_with_draw.csv", 500, seed=3,
+                       rules=RuleSet(deck_copies=3))
+        game.deal_starting_cards()
+        self.assertTrue(len(game.players) == 20 and game.players[0].name == "Human")
+        self.assertTrue(all(len(player.hand) == 7 for player in game.players))
+        self.assertTrue(game.deck.get_num_cards() == 3 * 108 - 20 * 7 - 1)
+
+
+    def test_valid_moves(self):
+        """
+        Test that each playable card in a hand is listed exactly once.
+        """
+        player = ComputerPlayer("Computer")
+        for card in [Card(None, None, "wild"), Card("red", 1), Card("blue", 2), Card("blue", 5), Card("red", 1)]:
+            player.add_to_hand(card)
+        valid_cards = player.get_valid_card_choices_from_hand(Card("red", 5))
+        self.assertTrue([str(card) for card in valid_cards] == ["wild", "red 1", "blue 5", "red 1"])
+        self.assertTrue(len(player.get_valid_card_choices_from_hand(Card("green", 0))) == 1)
+
+
+    def test_shared_cards_cant_change(self):
+        """
+        Test that a card from a hand can't be recolored, since every hand shares it.
+        """
+        player = ComputerPlayer("Computer")
+        player.add_to_hand(Card(None, None, "wild"))
+        with self.assertRaises(AttributeError):
+            player.hand[0].color = "red"
+        self.assertTrue(str(player.hand[0]) == "wild" and player.hand[0].with_color("red").color == "red")
+
+
+    def test_hand_index(self):
+        """
+        Test that a hand's counts follow the cards added to and removed from it.
+        """
+        player = ComputerPlayer("Computer")
+        for card in [Card(None, None, "wild"), Card("red", 1), Card("blue", 2), Card("red", 1)]:
+            player.add_to_hand(card)
+        self.assertTrue(player.hand.color_counts["red"] == 2 and player.hand.wild_count == 1)
+        player.hand.remove(Card("red", 1))
+        player.hand.pop(0)
+        self.assertTrue(player.hand.count(Card("red", 1)) == 1 and player.hand.wild_count == 0)
+        self.assertTrue(player.hand.playable_ids(Card("blue", 7)) == [Card("blue", 2).id])
+
+
+    def test_seeded_games_repeat(self):
+        """
+        Test that two games with the same seed are played exactly the same way.
+        """
+        logs = []
+        for i in range(2):
+            view = EventLogView()
+            UnoGame(view, None, ['random','random','random'], "uno_cards_special_with_draw.csv", 500, seed=42).play()
+            logs.append(view.events)
+        self.assertTrue(logs[0] == logs[1])
+
+
+    def test_forwarding_view(self):
+        """
+        Test that ForwardingView passes on every event a View can get, so wrappers don't lose any.
+        """
+        from view import View, ForwardingView
+        events = set(name for name in vars(View) if not name.startswith("_"))
+        self.assertTrue(events <= set(vars(ForwardingView)))
+
+
+    def test_profiler_keeps_events(self):
+        """
+        Test that a profiled game reports the same events to its view.
+        """
+        from profiling import GameProfiler
+        logs = []
+        for profile in [False, True]:
+            view = EventLogView()
+            game = seat_random_players(UnoGame(view, None, ['random','random','random'], "uno_cards_special_with_draw.csv", 500, seed=11))
+            profiler = GameProfiler()
+            if profile:
+                profiler.attach(game)
+            game.play()
+            logs.append(view.events)
+        self.assertTrue(logs[0] == logs[1] and profiler.counters["wins"] == 1)
+
+
+    def test_recorder_keeps_events(self):
+        """
+        Test that a recorded game reports the same events to its view and writes a record per turn.
+        """
+        import os, tempfile
+        from records import RecordWriter, RecordReader, record_game
+        logs = []
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "games.rec")
+            for record in [False, True]:
+                view = EventLogView()
+                game = seat_random_players(UnoGame(view, None, ['random','random','random'], "uno_cards_special_with_draw.csv", 500, seed=11))
+                if record:
+                    with RecordWriter(filename, 3) as writer:
+                        record_game(game, writer, 0)
+                        game.play()
+                else:
+                    game.play()
+                logs.append(view.events)
+            reader = RecordReader(filename)
+            self.assertTrue(len(reader) == 500 - game.turns_remaining)
+            reader.close()
+        self.assertTrue(logs[0] == logs[1])
+
+
+    def test_recorder_draws_and_jump_ins(self):
+        """
+        Test that records count every card drawn and give each jump-in a record of its own.
+        """
+        import os, tempfile
+        from records import DRAW, JUMP_IN, NO_CARD, RecordWriter, RecordReader, record_game
+        rules = RuleSet(jump_in=True, stacking=True, draw_until_playable=True)
+        view = EventLogView()
+        game = seat_random_players(UnoGame(view, None, ['random'] * 3, "uno_cards_special_with_draw.csv", 500, seed=2, rules=rules))
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "games.rec")
+            with RecordWriter(filename, 3) as writer:
+                record_game(game, writer, 0)
+                game.play()
+            reader = RecordReader(filename)
+            records = list(reader)
+            reader.close()
+        # Draws by the player whose turn it is, from the events
+        turn_draws = 0
+        turn_player = None
+        for event in view.events:
+            if event[0] == "turn":
+                turn_player = event[1]
+            elif event[0] == "draw" and event[1] == turn_player:
+                turn_draws += 1
+        jump_ins = [i for i, record in enumerate(records) if record.action == JUMP_IN]
+        self.assertTrue(sum(record.drawn for record in records) == turn_draws)
+        self.assertTrue(all(record.card == NO_CARD for record in records if record.action == DRAW))
+        self.assertTrue(len(jump_ins) > 0 and max(record.turn for record in records) + 1 == len(records) - len(jump_ins))
+        for i in jump_ins:
+            self.assertTrue(records[i].card == records[i - 1].card and records[i].turn == records[i - 1].turn)
+
+
+    def test_tracker_counts_unseen_cards(self):
+        """
+        Test that the card tracker's counts match the draw pile and the other hands after every turn,
+        and that it passes every event on to the game's view.
+        """
+        from card import CARD_KEYS, CARD_TABLE
+        from tracker import base_card, track_cards
+        for rules in [RuleSet(), RuleSet(stacking=True, jump_in=True, seven_zero=True, draw_until_playable=True, deck_copies=2)]:
+            for seed in range(3):
+                logs = []
+                for track in [False, True]:
+                    view = EventLogView()
+                    game = seat_random_players(UnoGame(view, None, ['random','basic','random'], "uno_cards_special_with_draw.csv", 300, seed=seed, rules=rules))
+                    if not track:
+                        game.play()
+                        logs.append(view.events)
+                        continue
+                    me = game.players[0]
+                    tracker = track_cards(game, me)
+                    play_turn = game.play_turn
+                    def checked_play_turn():
+                        result = play_turn()
+                        hidden = list(game.deck.buffer[game.deck.cursor:])
+                        for other in game.players:
+                            if other is not me:
+                                hidden.extend(other.hand.ids)
+                        hidden = [base_card(CARD_TABLE[card_id]) for card_id in hidden]
+                        self.assertEqual(tracker.num_unseen(), len(hidden))
+                        for card in set(hidden) | set(me.hand):
+                            self.assertEqual(tracker.unseen(card), hidden.count(card))
+                        for color in set(key[0] for key in CARD_KEYS):
+                            self.assertEqual(tracker.unseen_color(color), sum(card.color == color for card in hidden))
+                        return result
+                    game.play_turn = checked_play_turn
+                    game.play()
+                    logs.append(view.events)
+                self.assertTrue(logs[0] == logs[1])
+
+
+    def test_replay_seek(self):
+        """
+        Test that a replay reaches the same state as the recorded game at every turn, in any order.
+        """
+        import random
+        from replay import record_moves, Replay
+        strategies = ['random','basic','random']
+        game = UnoGame(NullView(), None, strategies, "uno_cards_special_with_draw.csv", 500, seed=7)
+        log = record_moves(game)
+        states = []
+        play_turn = game.play_turn
+        def recorded_play_turn():
+            states.append(game.snapshot(with_rng=False))
+            return play_turn()
+        game.play_turn = recorded_play_turn
+        game.play()
+
+        replay = Replay("uno_cards_special_with_draw.csv", 7, log, strategies, total_turns=500, checkpoint_every=16)
+        turns = list(range(len(states)))
+        random.Random(0).shuffle(turns)
+        for turn in turns:
+            replay.seek(turn)
+            self.assertTrue(replay.state().clone(rng_states=None) == states[turn])
+
+    def test_replay_house_rules(self):
+        """
+        Test that a game played with jump-ins and 7-0 swaps replays to the same states.
+        """
+        from replay import record_moves, Replay
+        strategies = ['random','basic','random']
+        rules = RuleSet(jump_in=True, seven_zero=True, stacking=True)
+        game = UnoGame(NullView(), None, strategies, "uno_cards_special_with_draw.csv", 300, seed=11, rules=rules)
+        log = record_moves(game)
+        states = []
+        play_turn = game.play_turn
+        def recorded_play_turn():
+            states.append(game.snapshot(with_rng=False))
+            return play_turn()
+        game.play_turn = recorded_play_turn
+        game.play()
+
+        replay = Replay("uno_cards_special_with_draw.csv", 11, log, strategies, total_turns=300, rules=rules)
+        for turn in reversed(range(len(states))):
+            replay.seek(turn)
+            self.assertTrue(replay.state().clone(rng_states=None) == states[turn])
+
+    def test_terminal_view_house_rules(self):
+        """
+        Test that the terminal view can show 7-0 swaps and card actions it has no message for.
+        """
+        import contextlib
+        import io
+        rules = RuleSet(seven_zero=True, actions={"skip": lambda game, card: game.skip()})
+        game = seat_random_players(UnoGame(TerminalView(), None, ['random','random','random'], "uno_cards_special_with_draw.csv", 300, seed=1, rules=rules))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            game.play()
+        self.assertIn("swapped hands", output.getvalue())
+        with contextlib.redirect_stdout(output):
+            game.view.show_card_action(game.players[0], game.players[1], Card("red", None, "double-skip"))
+        self.assertIn("took effect", output.getvalue())
+
+    def test_stacked_draws_shown(self):
+        """
+        Test that a stacked draw card isn't shown as though someone drew, and that the terminal view can show it.
+        """
+        import contextlib
+        import io
+        from view import ForwardingView
+        rules = RuleSet(stacking=True)
+        log = EventLogView()
+        game = seat_random_players(UnoGame(ForwardingView(log), None, ['random'] * 3, "uno_cards_special_with_draw.csv", 300, seed=1, rules=rules))
+        game.play()
+        draw_ids = set(Card(color, None, "draw-two").id for color in UnoGame.COLORS)
+        self.assertTrue(any(event[0] == "stack" for event in log.events))
+        self.assertFalse(any(event[0] == "action" and event[3] in draw_ids for event in log.events))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            TerminalView().show_stacked_draw(game.players[0], game.players[1], Card("red", None, "wild-draw-four"), 8)
+        self.assertIn("set the color to red. Computer 1 (random) has to stack a wild-draw-four or draw 8 cards!", output.getvalue())
+
+
+    def test_server_ignores_late_moves(self):
+        """
+        Test that a remote player's answer to a turn that timed out isn't used for the next turn.
+        """
+        import asyncio
+        from server import AsyncUnoGame, RemotePlayer
+
+        class SentMessages(NullView):
+            def __init__(self):
+                self.sent = []
+            def send(self, message):
+                self.sent.append(message)
+
+        async def play():
+            view = SentMessages()
+            game = AsyncUnoGame(view, None, ['basic'], "uno_cards_special_with_draw.csv", seed=2)
+            remote = RemotePlayer("Remote", view, game.new_rng())
+            remote.game = game
+            for card in [Card("red", 1), Card("blue", 2)]:
+                remote.add_to_hand(card)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(remote.choose_card_async(game.top_card), 0.01)
+            await remote.moves.put({"turn": 1, "play": 0})  # too late
+            choice = asyncio.ensure_future(remote.choose_card_async(game.top_card))
+            await asyncio.sleep(0)
+            await remote.moves.put({"turn": 1, "play": 0})  # still too late
+            await remote.moves.put({"turn": view.sent[-1]["turn"], "play": 1})
+            return await choice
+
+        self.assertTrue(str(asyncio.run(play())) == "blue 2")
+
+
+    def test_discard_pile_reshuffle(self):
+        """
+        Test that the discard pile is shuffled into an empty deck without losing cards.
+        """
+        game = UnoGame(NullView(), None, ['basic','basic','basic'], "uno_cards_basic.csv", seed=1)
+        player = game.players[0]
+        num_cards = game.deck.get_num_cards() + 1
+        game.deal_n_cards(game.deck.get_num_cards(), player)
+        for i in range(10):
+            game.deck.add_card(player.hand.pop())
+        game.deal_n_cards(4, player)
+        self.assertTrue(game.deck.get_num_cards() == 6 and game.deck.get_num_discards() == 0)
+        self.assertTrue(len(player.hand) + game.deck.get_num_cards() + 1 == num_cards)
+
+
+    def test_batch_engine_matches(self):
+        """
+        Test that random players win about as often in the batch engine as in UnoGame.
+        """
+        from batch import BatchUnoGame
+        num_games = 2000
+        batch = BatchUnoGame(num_games, ['random'] * 3, "uno_cards_special_with_draw.csv", 500, seed=1)
+        batch.play()
+        batch_wins = batch.win_counts()
+        game_wins = defaultdict(int)
+        for seed in range(num_games):
+            game = seat_random_players(UnoGame(NullView(), None, ['random'] * 3, "uno_cards_special_with_draw.csv", 500, seed=seed))
+            game_wins[game.play()] += 1
+        for name in ["Computer 0 (random)", "Computer 1 (random)", "Computer 2 (random)"]:
+            self.assertTrue(abs(batch_wins[name] - game_wins[name]) / num_games < 0.05)
+
+
+    def test_batch_basic_policy(self):
+        """
+        Test that basic players in the batch engine play the same turns as ComputerPlayers given the same cards.
+        """
+        from batch import BatchUnoGame
+        from state import GameState
+        for seed in range(5):
+            batch = BatchUnoGame(1, ['basic'] * 3, "uno_cards_special_with_draw.csv", 500, seed=seed)
+            game = UnoGame(NullView(), None, ['basic'] * 3, "uno_cards_special_with_draw.csv", 500, seed=seed)
+            hands = tuple(bytes(batch.order[0, i, :batch.order_len[0, i]].tolist()) for i in range(3))
+            game.restore(GameState(bytes(batch.draw[0, :batch.draw_len[0]].tolist()), b"", hands, int(batch.top[0]),
+                                   UnoGame.CLOCKWISE, 0, 500, None))
+            turns = 0
+            # Stop before the deck runs out, since the two engines reshuffle differently
+            while batch.draw_len[0] > 6 and not batch.done[0]:
+                batch.step()
+                game.play_turn()
+                turns += 1
+                hands = [bytes(batch.order[0, i, :batch.order_len[0, i]].tolist()) for i in range(3)]
+                self.assertTrue(hands == [bytes(player.hand.ids) for player in game.players])
+                self.assertTrue(batch.top[0] == game.top_card.id and batch.current[0] == game.current_player_index)
+            self.assertTrue(turns > 10)
+
+
+    def test_rollout_pool_shut_down(self):
+        """
+        Test that a Monte Carlo player's worker threads stop when the game ends, and that the cards
+        they can make exist before they start.
+        """
+        from card import CARD_TABLE
+        game = UnoGame(NullView(), None, ['montecarlo','random'], "uno_cards_special_with_draw.csv", 20, seed=3)
+        player = game.players[0]
+        player.rollouts, player.max_turns, player.workers = 4, 20, 2
+        pools = []
+        run_batches = player.run_batches
+        def checked_run_batches(*args):
+            num_cards = len(CARD_TABLE)
+            result = run_batches(*args)
+            pools.append(player.pool)
+            self.assertTrue(len(CARD_TABLE) == num_cards or len(pools) == 1)
+            return result
+        player.run_batches = checked_run_batches
+        game.play()
+        self.assertTrue(pools and pools[0] is not None and player.pool is None)
+
+
+    def test_rollout_card_ids(self):
+        """
+        Test that a state from a process with different card ids is translated back.
+        """
+        from card import CARD_KEYS
+        from montecarlo import translate_ids
+        game = UnoGame(NullView(), None, ['random','random','random'], "uno_cards_special_with_draw.csv", seed=5)
+        game.deal_starting_cards()
+        state = game.snapshot(with_rng=False)
+        # The other process saw the cards in the opposite order
+        other_keys = list(reversed(CARD_KEYS))
+        other = bytes(len(CARD_KEYS) - 1 - i for i in range(len(CARD_KEYS))) + bytes(256 - len(CARD_KEYS))
+        other_state = state.clone(deck=state.deck.translate(other), discard=state.discard.translate(other),
+                                  hands=tuple(hand.translate(other) for hand in state.hands),
+                                  top_card=other[state.top_card])
+        moves = [state.hands[0][0], None]
+        translated, translated_moves = translate_ids(other_state, [other[moves[0]], None], other_keys)
+        self.assertTrue(translated == state and translated_moves == moves)
+
+    def test_rollouts_use_game_rules(self):
+        """
+        Test that a Monte Carlo player can play a game dealt from two copies of the deck.
+        """
+        rules = RuleSet(deck_copies=2, stacking=True)
+        game = UnoGame(NullView(), None, ['montecarlo','random','random'], "uno_cards_special_with_draw.csv", 20, seed=6, rules=rules)
+        game.players[0].rollouts = 4
+        game.players[0].max_turns = 30
+        game.play()
+        self.assertEqual(game.rules.deck_copies, 2)
+
+
+    def test_policy_cache_save_load(self):
+        """
+        Test that a saved policy cache loads back with the same decisions in the same order, even in
+        a process that gave the cards other ids.
+        """
+        import os, tempfile
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import get_context
+        from policy_cache import PolicyCache
+        cache = PolicyCache(max_entries=50)
+        for game in lowest_card_games([4], cache):
+            game.play()
+        loaded = PolicyCache(max_entries=50)
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "cache.unopol")
+            cache.save(filename)
+            loaded.load(filename)
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                other = pool.submit(cached_decisions, filename, [("yellow", 9, None), (None, None, "wild")]).result()
+            expected = cached_decisions(filename)
+        self.assertTrue(len(cache) > 0 and list(loaded.entries.items()) == list(cache.entries.items()))
+        self.assertTrue(other == expected)
+
+
+    def test_policy_cache_same_play(self):
+        """
+        Test that a deterministic player plays exactly the same games with and without the cache,
+        and that stacked draw cards are part of what it sees.
+        """
+        from policy_cache import PolicyCache, observation_key
+        cache = PolicyCache()
+        logs = []
+        for cached in [None, cache, cache]:
+            view = EventLogView()
+            for game in lowest_card_games(range(5), cached, view):
+                game.play()
+            logs.append(view.events)
+        self.assertTrue(logs[0] == logs[1] == logs[2] and cache.hits >= cache.misses > 0)
+
+        game = lowest_card_games([0], None, rules=RuleSet(stacking=True))[0]
+        game.deal_starting_cards()
+        player = game.current_player()
+        key = observation_key(player, game.top_card)
+        game.pending_draw = 2
+        self.assertTrue(observation_key(player, game.top_card) != key)
+
+
+    def test_batched_policy_choices(self):
+        """
+        Test that choosing actions for a batch of observations gives the same choices as one at a time.
+        """
+        import numpy as np
+        from features import PolicyNetwork, choose_actions, encode_observation, playable_mask
+        game = UnoGame(NullView(), None, ['random','random','random'], "uno_cards_special_with_draw.csv", 500, seed=8)
+        game.deal_starting_cards()
+        features, masks = [], []
+        for turn in range(40):
+            player = game.current_player()
+            features.append(encode_observation(player, game.top_card))
+            masks.append(playable_mask(player, game.top_card))
+            if game.play_turn():
+                break
+        features, masks = np.array(features), np.array(masks)
+        network = PolicyNetwork(seed=0)
+        actions, colors = choose_actions(network, features, masks)
+        for i in range(len(features)):
+            action, color = choose_actions(network, features[i:i + 1], masks[i:i + 1])
+            self.assertTrue(action[0] == actions[i] and color[0] == colors[i] and masks[i][actions[i]])
+
+
+    def test_policy_custom_cards(self):
+        """
+        Test that policy players keep working once a custom card exists, and can play one from the shared slot.
+        """
+        from features import OTHER_SLOT, PolicyComputerPlayer, PolicyNetwork, encode_observation, playable_mask, play_policy_games
+        double_skip = Card("red", None, "double-skip")
+        network = PolicyNetwork(seed=0)
+        wins = play_policy_games(network, ['policy','random','random'], 4, "uno_cards_special_with_draw.csv", 200, seed=1)
+        self.assertTrue(sum(wins.values()) == 4)
+        game = UnoGame(NullView(), None, ['random','random'], "uno_cards_special_with_draw.csv", 10)
+        player = PolicyComputerPlayer("Policy", network)
+        player.game = game
+        game.players[0] = player
+        player.add_to_hand(Card("blue", 3))
+        player.add_to_hand(double_skip)
+        game.top_card = Card("red", 4)
+        self.assertTrue(encode_observation(player, game.top_card)[OTHER_SLOT] == 1)
+        self.assertTrue(playable_mask(player, game.top_card)[OTHER_SLOT])
+        self.assertTrue(player.take_action(OTHER_SLOT, 0).id == double_skip.id and len(player.hand) == 1)
+
+
+    def test_selfplay_resume(self):
+        """
+        Test that a self-play run that is started again only plays the shards that are missing.
+        """
+        import os, tempfile
+        from selfplay import run_selfplay, shard_filename
+        with tempfile.TemporaryDirectory() as folder:
+            first = run_selfplay(folder, ['random','random'], 6, games_per_shard=2, total_turns=100, seed=3, workers=1)
+            inode = os.stat(shard_filename(folder, 0)).st_ino
+            os.remove(shard_filename(folder, 1))
+            second = run_selfplay(folder, ['random','random'], 6, games_per_shard=2, total_turns=100, seed=3, workers=1)
+            self.assertTrue(os.stat(shard_filename(folder, 0)).st_ino == inode)  # not written again
+            self.assertTrue(second == first and len(second["shards"]) == 3 and second["games"] == 6)
+            self.assertTrue(sorted(name for name in os.listdir(folder) if name.endswith(".samples")) ==
+                            [os.path.basename(shard_filename(folder, shard)) for shard in range(3)])
+
+
+    def test_tournament_workers(self):
+        """
+        Test that a tournament gives the same results however its games are split between workers
+        """
+        from tournament import run_tournament
+        strategies = ['montecarlo','basic']
+        inline = run_tournament(strategies, 21, total_turns=40, seed=2, workers=1, profile=True)
+        pooled = run_tournament(strategies, 21, total_turns=40, seed=2, workers=3, chunk_size=7, profile=True)
+        self.assertTrue(inline.wins["Computer 0 (montecarlo)"] > 0)
+        self.assertTrue(pooled.wins == inline.wins)
+        self.assertTrue(pooled.profiler.counters == inline.profiler.counters)
+
+
+    def test_evaluate_workers(self):
+        """
+        Test that an evaluation stops at the same game whatever the number of workers
+        """
+        from evaluate import evaluate, ACCEPT_H1
+        results = []
+        for workers in (1, 3):
+            # Decides within the third batch of four, while later batches are still queued
+            evaluation = evaluate(['montecarlo','basic'], p0=0.1, p1=0.2, max_games=60, total_turns=40, seed=2,
+                                  workers=workers, batch_size=4)
+            results.append((evaluation.decision(), evaluation.games, evaluation.wins, evaluation.seat_wins))
+        self.assertTrue(results[0][0] == ACCEPT_H1 and results[0][1] < 12)
+        self.assertTrue(results[1] == results[0])
+
+
+    def test_deck_analytics(self):
+        """
+        Test that the deck statistics match counting pairs of cards in the deck by hand
+        """
+        from analytics import DeckAnalytics
+        from card import card_id, can_play
+        from deck import load_card_ids
+        deck_file = "uno_cards_special_with_draw.csv"
+        analytics = DeckAnalytics(deck_file)
+        cards = [CARD_TABLE[id_] for id_ in load_card_ids(deck_file)]
+
+        kinds = defaultdict(int)
+        for card in cards:
+            kinds[card.special or "number"] += 1
+        self.assertTrue(analytics.special_frequencies() == {kind: count / len(cards) for kind, count in kinds.items()})
+
+        fraction = 0
+        for i, card in enumerate(cards):
+            # A wild card on top has been given one of the four colors
+            tops = [card]
+            if card.special in ("wild", "wild-draw-four"):
+                tops = [CARD_TABLE[card_id(color, None, card.special)] for color in UnoGame.COLORS]
+            for top in tops:
+                chance = sum(can_play(other, top) for j, other in enumerate(cards) if j != i) / (len(cards) - 1)
+                self.assertTrue(abs(analytics.playable_chance(top) - chance) < 1e-9)
+                fraction += chance / len(tops) / len(cards)
+        self.assertTrue(abs(analytics.features()["playable fraction"] - fraction) < 1e-9)
+        self.assertTrue(abs(analytics.expected_playable(1)[0] - fraction) < 1e-9)
+        self.assertTrue(abs(analytics.expected_playable(1)[1] - fraction) < 1e-9)
+        self.assertTrue(analytics.estimate_turns_to_win(1000, max_turns=50, seed=1).sum() == 1000)
+
+
     def test_strategy(self):
         """
         Test to see if student strategy can beat the random strategy
         """
+        from evaluate import evaluate, ACCEPT_H1
         print("\n\nTESTING STUDENT'S COMPUTER STRATEGY.")
         print("STUDENT'S COMPUTER STRATEGY SHOULD WIN A HIGHER PERCENTAGE OF GAMES THAN THE RANDOM STRATEGY.")
-        print("PLAYING 1000 Strategy (Computer O) vs RANDOM (Computer 1) GAMES :")
-
-        game_stats = defaultdict(lambda : 0)
-        for i in tqdm(range(1000)):
-            stdout = sys.stdout
-            sys.stdout = io.StringIO()
-
-            game = UnoGame(TerminalView(), None, ['strategic','random'],  "uno_cards_special_with_draw.csv", 500)
+        print("PLAYING Strategy vs RANDOM GAMES UNTIL THE RESULT IS CLEAR (AT MOST 1000):")
 
-            winner = game.play()
-            game_stats[winner] += 1
-            sys.stdout = stdout
+        # Stops early once it is clear whether the strategy wins more than 35% or less than 25% of games
+        evaluation = evaluate(['strategic','random'], p0=0.25, p1=0.35, max_games=1000, workers=1)
 
         print("\nTEST COMPLETE. GAME STATS:")
-        print("_______________________________")
-        print("| Player.................Win % |")
-        for player, wins in game_stats.items():
-            print("| {}...{}% |".format(player, round(wins/1000*100,2)))
-        print("|______________________________|")
-        self.assertTrue(game_stats["Computer 0 (strategic)"]/1000 > 0.3)
+        print(evaluation)
+        if evaluation.decision():
+            self.assertTrue(evaluation.decision() == ACCEPT_H1)
+        else:
+            self.assertTrue(evaluation.win_rate(0) > 0.3)
 
 
-unittest.main()
+if __name__ == "__main__":
+    unittest.main()
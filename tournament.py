@@ -0,0 +1,171 @@
+# tournament.py
+
+# Plays many headless Uno games across all cores and merges the results
+
+import argparse
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from game import UnoGame
+from profiling import GameProfiler
+from records import RecordWriter, record_game
+from view import NullView
+
+DEFAULT_DECK = "uno_cards_special_with_draw.csv"
+
+
+def game_seed(seed, game_num):
+    """ Returns the seed for one game of a tournament. Every game gets its own
+    seed, so the results don't depend on how games are split between workers.
+
+    Args:
+        seed (int): the seed for the whole tournament
+        game_num (int): the index of the game in the tournament
+
+    Returns:
+        (int) the seed for the game
+    """
+    return seed * 2**32 + game_num
+
+
+def play_games(deck_file, strategies, total_turns, seed, start, stop, profile=False, record_dir=None):
+    """ Plays the games numbered start to stop with a NullView. This runs inside
+    a worker process, so it only takes (and returns) things that can be pickled.
+
+    Args:
+        deck_file (str): The filepath to the deck of cards
+        strategies (list of str): strategies for the computer players
+        total_turns (int): the number of turns before a game ends without a winner
+        seed (int): the seed for the whole tournament
+        start (int): index of the first game to play
+        stop (int): index after the last game to play
+        profile (bool): whether to measure the games with a GameProfiler
+        record_dir (str): if set, write a record of every turn to a file in this directory
+
+    Returns:
+        (Counter, GameProfiler) wins for each player name (games without a winner
+        count under None) and the profiler, or None if profile is False
+    """
+    view = NullView()
+    wins = Counter()
+    profiler = GameProfiler() if profile else None
+    writer = None
+    if record_dir:
+        writer = RecordWriter(os.path.join(record_dir, "games_{:09d}.unorec".format(start)), len(strategies))
+    for game_num in range(start, stop):
+        game = UnoGame(view, None, strategies, deck_file, total_turns, game_seed(seed, game_num))
+        if profiler:
+            profiler.attach(game)
+        if writer:
+            record_game(game, writer, game_num)
+        wins[game.play()] += 1
+    if writer:
+        writer.close()
+    return wins, profiler
+
+
+class TournamentResult():
+    """The merged results of a tournament.
+
+    Args:
+        wins (Counter): wins for each player name (None for games without a winner)
+        profiler (GameProfiler): measurements of the games, if they were profiled
+    """
+
+    def __init__(self, wins=None, profiler=None):
+        self.wins = wins or Counter()
+        self.profiler = profiler
+
+    def merge(self, wins, profiler=None):
+        """ Adds the wins from one batch of games to the result
+
+        Args:
+            wins (Counter): wins for each player name
+            profiler (GameProfiler): measurements of the batch of games
+        """
+        self.wins.update(wins)
+        if profiler:
+            if self.profiler is None:
+                self.profiler = GameProfiler()
+            self.profiler.merge(profiler)
+
+    def num_games(self):
+        """ Returns the number of games played
+        """
+        return sum(self.wins.values())
+
+    def win_rate(self, name):
+        """ Returns the fraction of games won by a player
+
+        Args:
+            name (str): the player's name
+        """
+        if self.num_games() == 0:
+            return 0.0
+        return self.wins[name] / self.num_games()
+
+    def __str__(self):
+        lines = ["_______________________________",
+                 "| Player.................Win % |"]
+        for name, wins in self.wins.most_common():
+            lines.append("| {}...{}% |".format(name or "No winner", round(self.win_rate(name)*100, 2)))
+        lines.append("|______________________________|")
+        return "\n".join(lines)
+
+
+def run_tournament(strategies, num_games, deck_file=DEFAULT_DECK, total_turns=500, seed=0, workers=None, chunk_size=None,
+                   profile=False, record_dir=None):
+    """ Plays num_games games between computer players, spread over a pool of
+    worker processes.
+
+    Args:
+        strategies (list of str): strategies for the computer players
+        num_games (int): how many games to play
+        deck_file (str): The filepath to the deck of cards
+        total_turns (int): the number of turns before a game ends without a winner
+        seed (int): the seed for the tournament. The same seed gives the same result.
+        workers (int): number of worker processes (defaults to one per core)
+        chunk_size (int): number of games each worker plays per task
+        profile (bool): whether to measure the games with a GameProfiler
+        record_dir (str): if set, write a record of every turn to files in this directory
+
+    Returns:
+        (TournamentResult) the merged wins of every game
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, min(1000, num_games // (workers * 4)))
+    result = TournamentResult()
+
+    if workers == 1:
+        result.merge(*play_games(deck_file, strategies, total_turns, seed, 0, num_games, profile, record_dir))
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for start in range(0, num_games, chunk_size):
+            stop = min(start + chunk_size, num_games)
+            futures.append(pool.submit(play_games, deck_file, strategies, total_turns, seed, start, stop, profile, record_dir))
+        for future in futures:
+            result.merge(*future.result())
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a headless Uno tournament between computer players.")
+    parser.add_argument("strategies", nargs="+", help="computer strategies (basic, random, strategic or montecarlo)")
+    parser.add_argument("-n", "--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("-f", "--deck", default=DEFAULT_DECK, help="deck file")
+    parser.add_argument("-t", "--turns", type=int, default=500, help="turns before a game ends without a winner")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="tournament seed")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("-p", "--profile", default=None, help="profile the games and write the results to this JSON file")
+    parser.add_argument("-r", "--record", default=None, help="write a record of every turn to files in this directory")
+    args = parser.parse_args()
+
+    result = run_tournament(args.strategies, args.games, args.deck, args.turns, args.seed, args.workers,
+                            profile=bool(args.profile), record_dir=args.record)
+    print("PLAYED {} GAMES:".format(result.num_games()))
+    print(result)
+    if args.profile:
+        result.profiler.dump(args.profile)
@@ -0,0 +1,197 @@
+# tracker.py
+
+# Counts the cards one player hasn't seen, and guesses which colors their opponents are out of
+#
+# A CardTracker sits between an UnoGame and its view (like records.GameRecorder
+# does) and updates its counts from the game's events as they happen, so asking
+# how many of a card are still unseen never scans the deck or the discard pile.
+#
+#     tracker = track_cards(game, player)
+#     tracker.unseen(Card("red", 5)), tracker.void_chance(game.next_player(), "red")
+
+from card import CARD_KEYS, CARD_TABLE
+from view import ForwardingView
+
+WILDS = ("wild", "wild-draw-four")
+
+
+def base_card(card):
+    """ Returns the card as it is held: wild cards on top of the pile have a color,
+    but the same wild card in a hand or the deck doesn't
+    """
+    if card.special in WILDS and card.color is not None:
+        return card.with_color(None)
+    return card
+
+
+class CardTracker(ForwardingView):
+    """Keeps count of the cards one player hasn't seen: every card in the game
+    except the ones in their hand, on top of the pile and in the discard pile. Cards
+    in the discard pile go back to being unseen when it is shuffled into the deck.
+
+    It also watches for opponents drawing when they could have played a card of
+    the top card's color, which (for a player who plays when they can) means they
+    had none of that color. Use track_cards() to attach one.
+
+    Args:
+        game (UnoGame): the game to watch
+        player (Player): the player whose view of the game is tracked
+    """
+
+    def __init__(self, game, player):
+        super().__init__(game.view)
+        self.game = game
+        self.player = player
+        game.view = self
+
+        # Every card in the game, which is public: it is what the deck file says
+        self.total = [0] * len(CARD_TABLE)
+        self.total_colors = {}
+        deck = game.deck
+        cards = list(deck.buffer[deck.cursor:]) + list(deck.buffer[:deck.num_discards])
+        cards.append(base_card(game.top_card).id)
+        for other in game.players:
+            cards.extend(other.hand.ids)
+        for card_id in cards:
+            self.total[card_id] += 1
+            color = CARD_KEYS[card_id][0]
+            self.total_colors[color] = self.total_colors.get(color, 0) + 1
+        self.total_cards = len(cards)
+
+        self.seen = [0] * len(CARD_TABLE)  # cards on the discard pile or on top, by card id
+        self.seen_colors = {}
+        self.seen_cards = 0
+        for card_id in deck.buffer[:deck.num_discards]:
+            self.see(card_id, 1)
+        self.see(base_card(game.top_card).id, 1)
+
+        # hand -> {color: cards drawn since the hand was seen to have none of that
+        # color}. These are keyed by hand rather than player so they follow hands
+        # that are swapped or passed on by the 7-0 rule.
+        self.voids = {}
+        self.turn_player = None
+        self.turn_color = None
+        self.turn_played = True
+
+    def see(self, card_id, change):
+        """ Adds a card to the seen cards (change=1) or takes it out (change=-1)
+        """
+        if card_id >= len(self.seen):
+            self.seen.extend([0] * (len(CARD_TABLE) - len(self.seen)))
+            self.total.extend([0] * (len(CARD_TABLE) - len(self.total)))
+        self.seen[card_id] += change
+        color = CARD_KEYS[card_id][0]
+        self.seen_colors[color] = self.seen_colors.get(color, 0) + change
+        self.seen_cards += change
+
+    def unseen(self, card):
+        """ Returns how many copies of a card the player hasn't seen
+
+        Args:
+            card (Card): the card (a colored wild card counts as the plain one)
+        """
+        card_id = base_card(card).id
+        if card_id >= len(self.total):
+            return 0
+        return self.total[card_id] - self.seen[card_id] - self.player.hand.count(CARD_TABLE[card_id])
+
+    def unseen_color(self, color):
+        """ Returns how many cards of a color the player hasn't seen
+
+        Args:
+            color (str): the color, or None for wild cards
+        """
+        if color is None:
+            held = self.player.hand.wild_count
+        else:
+            held = self.player.hand.color_counts.get(color, 0)
+        return self.total_colors.get(color, 0) - self.seen_colors.get(color, 0) - held
+
+    def num_unseen(self):
+        """ Returns how many cards the player hasn't seen
+        """
+        return self.total_cards - self.seen_cards - len(self.player.hand)
+
+    def void_chance(self, player, color):
+        """ Estimates the chance that a player holds no cards of a color. Once they
+        draw instead of playing on that color, it is the chance that none of the
+        cards they have drawn since (including that one) is of the color. It is 0
+        if there's no sign they are out of the color.
+
+        Args:
+            player (Player): the opponent
+            color (str): the color
+
+        Returns:
+            (float) the chance
+        """
+        drawn = self.voids.get(player.hand, {}).get(color)
+        if drawn is None:
+            return 0.0
+        unseen = self.num_unseen()
+        if unseen <= 0:
+            return 1.0
+        return max(0.0, 1 - self.unseen_color(color) / unseen) ** drawn
+
+    def show_beginning_turn(self, player, top_card):
+        self.turn_player = player
+        self.turn_color = top_card.color
+        # Drawing only says something about the player's hand if they chose to
+        self.turn_played = player is self.player or self.game.pending_draw > 0
+        self.view.show_beginning_turn(player, top_card)
+
+    def show_played_card(self, player, card):
+        if player is self.turn_player:
+            self.turn_played = True
+        self.see(card.id, 1)
+        if card.color is not None:
+            self.voids.get(player.hand, {}).pop(card.color, None)
+        self.view.show_played_card(player, card)
+
+    def show_invalid_card(self, player, card, top_card):
+        self.see(card.id, -1)  # it went back into their hand
+        self.view.show_invalid_card(player, card, top_card)
+
+    def show_drawing_card(self, player):
+        if not self.turn_played and player is self.turn_player:
+            self.turn_played = True
+            if self.turn_color is not None:
+                self.voids.setdefault(player.hand, {})[self.turn_color] = 0
+        voids = self.voids.get(player.hand)
+        if voids:
+            for color in voids:
+                voids[color] += 1
+        self.view.show_drawing_card(player)
+
+    def show_shuffling_deck(self):
+        # The discard pile goes back into the deck, unseen again; only the top card stays
+        self.seen = [0] * len(CARD_TABLE)
+        self.seen_colors = {}
+        self.seen_cards = 0
+        self.see(base_card(self.game.top_card).id, 1)
+        self.view.show_shuffling_deck()
+
+    def show_card_action(self, player, next_player, card):
+        # Players choose colors they have cards of
+        if card.special in WILDS and card.color is not None:
+            self.voids.get(player.hand, {}).pop(card.color, None)
+        self.view.show_card_action(player, next_player, card)
+
+    def show_stacked_draw(self, player, next_player, card, pending_draw):
+        if card.special in WILDS and card.color is not None:
+            self.voids.get(player.hand, {}).pop(card.color, None)
+        self.view.show_stacked_draw(player, next_player, card, pending_draw)
+
+
+def track_cards(game, player):
+    """ Starts tracking the cards a player has and hasn't seen. Call this before
+    game.play(), or at any point during the game.
+
+    Args:
+        game (UnoGame): the game
+        player (Player): the player whose view of the game is tracked
+
+    Returns:
+        (CardTracker) the tracker
+    """
+    return CardTracker(game, player)
@@ -1,6 +1,56 @@
-from simple_term_menu import TerminalMenu
+class View:
+    """The events an UnoGame reports to its view. A view has no idea what is going
+    on in the game, it just gets a call for each event. Every event does nothing
+    here, so a view only needs to define the events it cares about.
+    """
+
+    def welcome(self):
+        pass
+
+    def setup(self):
+        """The cards are about to be dealt."""
+        pass
+
+    def show_beginning_turn(self, player, top_card):
+        pass
+
+    def show_played_card(self, player, card):
+        pass
+
+    def show_drawing_card(self, player):
+        pass
+
+    def show_invalid_card(self, player, card, top_card):
+        pass
+
+    def show_shuffling_deck(self):
+        """The discard pile is being shuffled to become the deck."""
+        pass
+
+    def show_empty_decks(self):
+        pass
+
+    def show_ending_turn(self, player):
+        pass
+
+    def show_winning_game(self, player):
+        pass
+
+    def show_out_of_cards(self):
+        pass
+
+    def show_card_action(self, player, next_player, card):
+        """A special card's action has happened. card is the top card after the action."""
+        pass
+
+    def show_stacked_draw(self, player, next_player, card, pending_draw):
+        """A draw card was stacked: next_player has to stack another or draw pending_draw cards."""
+        pass
+
+    def end_game(self):
+        pass
 
-class TerminalView:
+class TerminalView(View):
     """Handles input and output from a Game.
     You should switch into a different mode while reading this file: here, it's about
     the "skin" the game – like a user interface – whereas over in game.py it's about the
@@ -18,6 +68,11 @@ class TerminalView:
         "wild": "{player.name} set the color to {card.color}",
         "skip": "Skipped {next_player.name}!",
         "reverse": "Change directions!",
+        7: "{player.name} swapped hands!",
+        0: "Everyone passed their hand on!",
+        "stack-draw-two": "{next_player.name} has to stack a draw-two or draw {pending_draw} cards!",
+        "stack-wild-draw-four": "{player.name} set the color to {card.color}. {next_player.name} has to stack a "
+                                "wild-draw-four or draw {pending_draw} cards!",
     }
 
     def welcome(self):
@@ -32,6 +87,7 @@ class TerminalView:
 
     def menu(self,prompt, options):
         '''This function creates an interactive Terminal menu.'''
+        from simple_term_menu import TerminalMenu  # only needed when a person is playing
 
         print(prompt)
         terminal_menu = TerminalMenu(options) #Creates the Terminal Menu 
@@ -76,10 +132,153 @@ class TerminalView:
         print("Not enough cards in deck. Ending game.")
 
     def show_card_action(self, player, next_player, card):
-        message = self.CARD_ACTION_MESSAGES[card.special]
+        message = self.CARD_ACTION_MESSAGES.get(card.special or card.number, "{card} took effect!")
         print(message.format(player=player, next_player=next_player, card=card))
 
+    def show_stacked_draw(self, player, next_player, card, pending_draw):
+        message = self.CARD_ACTION_MESSAGES["stack-" + card.special]
+        print(message.format(player=player, next_player=next_player, card=card, pending_draw=pending_draw))
+
     def end_game(self):
         print("-"*25)
         print("-"*25)
 
+class ForwardingView(View):
+    """A view that passes every event on to another view. Subclasses sit between
+    a game and its real view and override the events they want to watch, passing
+    each one on with the same call to self.view. Anything else, like a
+    TerminalView's menu(), is looked up on the real view.
+
+    Args:
+        view (View): the view to pass events on to
+    """
+
+    def __init__(self, view):
+        self.view = view
+
+    def __getattr__(self, name):
+        return getattr(self.view, name)
+
+    def welcome(self):
+        self.view.welcome()
+
+    def setup(self):
+        self.view.setup()
+
+    def show_beginning_turn(self, player, top_card):
+        self.view.show_beginning_turn(player, top_card)
+
+    def show_played_card(self, player, card):
+        self.view.show_played_card(player, card)
+
+    def show_drawing_card(self, player):
+        self.view.show_drawing_card(player)
+
+    def show_invalid_card(self, player, card, top_card):
+        self.view.show_invalid_card(player, card, top_card)
+
+    def show_shuffling_deck(self):
+        self.view.show_shuffling_deck()
+
+    def show_empty_decks(self):
+        self.view.show_empty_decks()
+
+    def show_ending_turn(self, player):
+        self.view.show_ending_turn(player)
+
+    def show_winning_game(self, player):
+        self.view.show_winning_game(player)
+
+    def show_out_of_cards(self):
+        self.view.show_out_of_cards()
+
+    def show_card_action(self, player, next_player, card):
+        self.view.show_card_action(player, next_player, card)
+
+    def show_stacked_draw(self, player, next_player, card, pending_draw):
+        self.view.show_stacked_draw(player, next_player, card, pending_draw)
+
+    def end_game(self):
+        self.view.end_game()
+
+class NullView(View):
+    """A view for headless games. It ignores every event, so simulations don't pay
+    for formatting or printing anything.
+    """
+    pass
+
+class EventLogView(View):
+    """A view that records each event as a compact tuple instead of printing it,
+    e.g. ("play", player_name, card_id). Cards are stored as their ids in the
+    CARD_TABLE. No strings are formatted while the game runs.
+
+    Args:
+        sink (function): optional function called with each full buffer of events
+        buffer_size (int): number of events to buffer before calling the sink
+    """
+
+    def __init__(self, sink=None, buffer_size=4096):
+        self.events = []
+        self.sink = sink
+        self.buffer_size = buffer_size
+
+    def record(self, event):
+        """ Adds an event to the buffer, passing the buffer to the sink when it is full
+
+        Args:
+            event (tuple): the event
+        """
+        self.events.append(event)
+        if self.sink and len(self.events) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """ Empties the buffer, passing the events to the sink if there is one
+
+        Returns:
+            (list of tuple) the events that were in the buffer
+        """
+        events = self.events
+        self.events = []
+        if self.sink and events:
+            self.sink(events)
+        return events
+
+    def setup(self):
+        self.record(("setup",))
+
+    def show_beginning_turn(self, player, top_card):
+        self.record(("turn", player.name, top_card.id))
+
+    def show_played_card(self, player, card):
+        self.record(("play", player.name, card.id))
+
+    def show_drawing_card(self, player):
+        self.record(("draw", player.name))
+
+    def show_invalid_card(self, player, card, top_card):
+        self.record(("invalid", player.name, card.id, top_card.id))
+
+    def show_shuffling_deck(self):
+        self.record(("shuffle",))
+
+    def show_empty_decks(self):
+        self.record(("empty",))
+
+    def show_ending_turn(self, player):
+        self.record(("end_turn", player.name))
+
+    def show_winning_game(self, player):
+        self.record(("win", player.name))
+
+    def show_out_of_cards(self):
+        self.record(("out_of_cards",))
+
+    def show_card_action(self, player, next_player, card):
+        self.record(("action", player.name, next_player.name, card.id))
+
+    def show_stacked_draw(self, player, next_player, card, pending_draw):
+        self.record(("stack", player.name, next_player.name, card.id, pending_draw))
+
+    def end_game(self):
+        self.record(("end_game",))